@@ -0,0 +1,202 @@
+"""
+紧凑的数组搜索树：节点用整数编号，统计保存在 array 列中，节点本身不保存局面，
+搜索时从根局面重放走法得到。子节点在扩展时才追加一行，同一节点的子节点用链表串起来，
+每个节点占用20字节。
+与 mcts.MCTSNode 的搜索过程完全相同 (相同种子得到相同的走法)。
+"""
+import math
+import time
+from array import array
+
+# 格子编号 idx = r * 9 + c -> 坐标元组
+_MOVES = [(r, c) for r in range(9) for c in range(9)]
+
+
+# 列名与类型码：编号和计数用32位整数，格子编号、玩家和子节点数用单字节
+_COLUMN_NAMES = ("move", "player", "visits", "wins", "first_child", "next_sibling", "child_count", "tried")
+_COLUMN_TYPES = ("b", "b", "i", "i", "i", "i", "B", "B")
+
+# child_count 的这个值表示还没有生成过合法落子列表
+_UNPREPARED = 255
+
+
+class ArrayTree:
+    """
+    列式存储的搜索树，接口与 mcts.NodeTree 相同，可以通过 MCTS_AI(tree="array") 使用。
+    第 i 个节点的数据:
+      move[i]         从父节点走到这里的格子编号
+      player[i]       走出这一步的玩家
+      visits[i]       访问次数
+      wins[i]         player[i] 获胜的次数
+      first_child[i]  最后扩展的子节点的编号，没有子节点时为 -1
+      next_sibling[i] 在它之前扩展的兄弟节点的编号，没有时为 -1
+      child_count[i]  合法落子数 (筛选之后)，第一次经过之前为 _UNPREPARED
+      tried[i]        已经扩展的子节点数
+    未扩展的走法不占用行：合法落子列表按行优先排列，与 MCTSNode 相同从后往前依次扩展，
+    下一个要扩展的就是列表中倒数第 tried[i] + 1 个，扩展时在当前局面上重新生成列表即可。
+    """
+
+    def __init__(self, state, exploration_constant=1.414, prune=None):
+        self.C = exploration_constant
+        # 生成合法落子列表后的筛选函数，与 mcts.MCTSNode.prepare 相同
+        self.prune = prune
+        self.size = 0
+        for name, typecode in zip(_COLUMN_NAMES, _COLUMN_TYPES):
+            setattr(self, name, array(typecode))
+        self._add_node(-1, 3 - state.current_player)
+        # 根节点的合法落子列表，root_stats 用它列出尚未扩展的走法
+        self._root_moves = None
+
+    def _columns(self):
+        return tuple(getattr(self, name) for name in _COLUMN_NAMES)
+
+    def _add_node(self, idx, player) -> int:
+        """在末尾追加一个节点，返回它的编号 (array.append 只多预留几个百分点的空间)"""
+        self.move.append(idx)
+        self.player.append(player)
+        self.visits.append(0)
+        self.wins.append(0)
+        self.first_child.append(-1)
+        self.next_sibling.append(-1)
+        self.child_count.append(_UNPREPARED)
+        self.tried.append(0)
+        self.size += 1
+        return self.size - 1
+
+    def _legal_moves(self, state):
+        legal = state.get_legal_moves()
+        return self.prune(state, legal) if self.prune is not None else legal
+
+    def nbytes(self) -> int:
+        """已使用节点占用的字节数"""
+        return sum(col.itemsize for col in self._columns()) * self.size
+
+    def select_and_expand(self, state, undo_stack: list, path: list, moves=None, marks=None):
+        """
+        从根节点向下选择并扩展一个节点，state 随之推进，撤销记录压入 undo_stack。
+        经过的节点编号依次追加到 path (包含根节点和叶子)，给出 moves 时同时记录走法，
+        给出 marks 时把选择阶段结束的时刻追加到 marks (与 mcts.NodeTree 相同)。
+        """
+        first_child, next_sibling = self.first_child, self.next_sibling
+        child_count, tried = self.child_count, self.tried
+        visits, wins = self.visits, self.wins
+        node = 0
+        path.append(node)
+        while True:
+            legal = None
+            count = child_count[node]
+            if count == _UNPREPARED:
+                # 第一次经过：只记下合法落子数，子节点在扩展时才分配
+                legal = self._legal_moves(state)
+                count = child_count[node] = len(legal)
+                if node == 0:
+                    self._root_moves = legal
+
+            done = tried[node]
+            if done < count or first_child[node] < 0:
+                if marks is not None:
+                    marks.append(time.perf_counter())
+                if done >= count:
+                    # 无棋可下
+                    return
+                # 2. 扩展 (Expansion)：下一个尚未尝试的走法，新建子节点并从它开始模拟
+                if legal is None:
+                    legal = self._legal_moves(state)
+                move = legal[count - 1 - done]
+                tried[node] = done + 1
+                child = self._add_node(move[0] * 9 + move[1], state.current_player)
+                next_sibling[child] = first_child[node]
+                first_child[node] = child
+                undo_stack.append(state.make_move(move))
+                path.append(child)
+                if moves is not None:
+                    moves.append(move)
+                return
+
+            # 1. 选择 (Selection)：所有子节点都已访问过 (访问次数都不为0)，按UCT公式选择。
+            #    父节点的对数项对所有子节点只算一次。链表从最后扩展的子节点开始，
+            #    平分时用 >= 取最早扩展的一个，与 MCTSNode.select_child 相同
+            log_visits = math.log(visits[node])
+            c = self.C
+            i = child = first_child[node]
+            best = -1.0
+            while i >= 0:
+                v = visits[i]
+                score = (wins[i] / v) + c * math.sqrt(log_visits / v)
+                if score >= best:
+                    best = score
+                    child = i
+                i = next_sibling[i]
+
+            move = _MOVES[self.move[child]]
+            undo_stack.append(state.make_move(move))
+            path.append(child)
+            if moves is not None:
+                moves.append(move)
+            node = child
+
+    def update(self, path: list, visits: int, winner):
+        """path 上每个节点访问次数加 visits，走出该节点的玩家获胜时胜利次数加1"""
+        visit_col, wins, player = self.visits, self.wins, self.player
+        for node in path:
+            visit_col[node] += visits
+            if player[node] == winner:
+                wins[node] += 1
+
+    def node_count(self) -> int:
+        return self.size
+
+    def _children(self, node: int) -> list:
+        """node 的子节点编号，按扩展顺序排列"""
+        children = []
+        child = self.first_child[node]
+        while child >= 0:
+            children.append(child)
+            child = self.next_sibling[child]
+        children.reverse()
+        return children
+
+    def root_stats(self):
+        """根节点各子节点的 [(走法, 访问次数, 胜利次数)]，尚未尝试的走法统计为0"""
+        if self.child_count[0] == _UNPREPARED:
+            return []
+        stats = [(_MOVES[self.move[i]], self.visits[i], self.wins[i]) for i in self._children(0)]
+        stats.extend((move, 0, 0) for move in self._root_moves[:self.child_count[0] - self.tried[0]])
+        return stats
+
+    def advance(self, move, state) -> bool:
+        """
+        把走法 move 对应的子节点提升为树根 (state 已经推进到它的局面)，
+        按广度优先把它的子树复制到新的列中，其余节点随之丢弃。没有这个子节点时返回 False。
+        """
+        idx = move[0] * 9 + move[1]
+        old_root = self.first_child[0]
+        while old_root >= 0 and self.move[old_root] != idx:
+            old_root = self.next_sibling[old_root]
+        if old_root < 0:
+            return False
+
+        # 旧编号按广度优先的队列顺序映射为新编号，兄弟链表按原来的顺序重新连接
+        old_columns = self._columns()
+        old_first, old_next = self.first_child, self.next_sibling
+        for name, col in zip(_COLUMN_NAMES, old_columns):
+            setattr(self, name, array(col.typecode))
+        pairs = tuple(zip(self._columns(), old_columns))
+
+        queue = [old_root]
+        siblings = [-1]
+        # 遍历过程中 queue 不断追加，直到整棵子树都复制完
+        for i, old in enumerate(queue):
+            for col, old_col in pairs:
+                col.append(old_col[old])
+            self.next_sibling[i] = siblings[i]
+            child = old_first[old]
+            if child >= 0:
+                self.first_child[i] = len(queue)
+                while child >= 0:
+                    queue.append(child)
+                    child = old_next[child]
+                    siblings.append(len(queue) if child >= 0 else -1)
+        self.size = len(queue)
+        self._root_moves = self._legal_moves(state) if self.child_count[0] != _UNPREPARED else None
+        return True
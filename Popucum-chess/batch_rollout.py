@@ -0,0 +1,226 @@
+"""
+NumPy 批量模拟引擎：同时推进 N 局游戏的随机对局，直到40回合上限。
+规则与 mcts.GameState 完全一致，用于 MCTS 一次性模拟一批叶子节点。
+"""
+import numpy as np
+
+BOARD_SIZE = 9
+MAX_TURNS = 40
+
+# 内部布局：每行补一个永远为空的列，格子编号 q = r * 10 + c。
+# 这样四个三连方向都是一维平移 (1, 10, 11, 9)，且不会跨行误连。
+_WIDTH = BOARD_SIZE + 1
+_CELLS = BOARD_SIZE * _WIDTH
+# 哨兵格：第0行的补充列。不足长度的窗口表和射线表都用它填充，写入后会被清零
+_SENTINEL = BOARD_SIZE
+# 行优先的81个真实格子编号 -> 内部编号
+_CELL_INDEX = np.array([r * _WIDTH + c for r in range(BOARD_SIZE) for c in range(BOARD_SIZE)], dtype=np.intp)
+_VALID = np.zeros(_CELLS, dtype=bool)
+_VALID[_CELL_INDEX] = True
+_SHIFTS = (1, _WIDTH, _WIDTH + 1, _WIDTH - 1)  # 横、竖、主对角线、副对角线
+
+
+# --- 1. 预计算查找表 ---
+
+def _ray(r, c, dr, dc):
+    cells = []
+    r, c = r + dr, c + dc
+    while 0 <= r < BOARD_SIZE and 0 <= c < BOARD_SIZE:
+        cells.append(r * _WIDTH + c)
+        r, c = r + dr, c + dc
+    return cells
+
+
+def _build_tables():
+    """
+    _WIN_CELLS[q]: 包含格子 q 的所有三连窗口的三个格子, 形状 (90, 12, 3)
+    _WIN_RAYS[q]:  每个窗口两端的扩散射线, 形状 (90, 12, 2, 8)
+    """
+    windows = [[] for _ in range(_CELLS)]
+    for dr, dc in [(0, 1), (1, 0), (1, 1), (1, -1)]:
+        for r in range(BOARD_SIZE):
+            for c in range(BOARD_SIZE):
+                r3, c3 = r + 2 * dr, c + 2 * dc
+                if not (0 <= r3 < BOARD_SIZE and 0 <= c3 < BOARD_SIZE):
+                    continue
+                cells = [(r + i * dr) * _WIDTH + (c + i * dc) for i in range(3)]
+                rays = (_ray(r3, c3, dr, dc), _ray(r, c, -dr, -dc))
+                for cell in cells:
+                    windows[cell].append((cells, rays))
+
+    max_windows = max(len(w) for w in windows)
+    max_ray = BOARD_SIZE - 1
+    win_cells = np.full((_CELLS, max_windows, 3), _SENTINEL, dtype=np.intp)
+    win_rays = np.full((_CELLS, max_windows, 2, max_ray), _SENTINEL, dtype=np.intp)
+    for q, cell_windows in enumerate(windows):
+        for w, (cells, rays) in enumerate(cell_windows):
+            win_cells[q, w] = cells
+            for k, ray in enumerate(rays):
+                win_rays[q, w, k, :len(ray)] = ray
+    return win_cells, win_rays
+
+
+_WIN_CELLS, _WIN_RAYS = _build_tables()
+
+
+# --- 2. 批量状态与落子 ---
+
+def new_batch(n):
+    """
+    分配 N 局的批量数组:
+    board / territory 形状 (N, 9, 9)，current_player / turn_count 形状 (N,)
+    """
+    board = np.zeros((n, BOARD_SIZE, BOARD_SIZE), dtype=np.int8)
+    territory = np.zeros((n, BOARD_SIZE, BOARD_SIZE), dtype=np.int8)
+    player = np.empty(n, dtype=np.int8)
+    turn = np.empty(n, dtype=np.int16)
+    return board, territory, player, turn
+
+
+def store_state(batch, i, state):
+    """把一个 GameState (或 BitboardGameState) 写入批量数组的第 i 局"""
+    board, territory, player, turn = batch
+    board[i] = state.board
+    territory[i] = state.territory
+    player[i] = state.current_player
+    turn[i] = state.turn_count
+
+
+def stack_states(states):
+    """把若干 GameState 打包成批量数组"""
+    batch = new_batch(len(states))
+    for i, state in enumerate(states):
+        store_state(batch, i, state)
+    return batch
+
+
+def _pad(grid):
+    """(N, 9, 9) -> 内部布局 (N, 90)"""
+    n = grid.shape[0]
+    padded = np.zeros((n, BOARD_SIZE, _WIDTH), dtype=np.int8)
+    padded[:, :, :BOARD_SIZE] = grid
+    return padded.reshape(n, _CELLS)
+
+
+def _find_threes(board, player):
+    """每局棋盘上是否存在 player 的三连 (N,)"""
+    own = board == player[:, None]
+    found = np.zeros(board.shape[0], dtype=bool)
+    for s in _SHIFTS:
+        found |= (own[:, :-2 * s] & own[:, s:-s] & own[:, 2 * s:]).any(axis=1)
+    return found
+
+
+def apply_moves(board, territory, player, turn, games, moves):
+    """
+    在 games 指定的对局上同时落子 moves (内部格子编号)，并完成三连消除和领地扩散。
+    board / territory 为内部布局 (N, 90)，就地修改。
+    """
+    p = player[games]
+    board.reshape(-1)[games * _CELLS + moves] = p
+
+    # 落子前棋盘上不可能存在三连 (形成即消除)，所以整盘检测到的三连必然包含新落子
+    sub = board if games.size == board.shape[0] else board[games]
+    found = _find_threes(sub, p)
+
+    if found.any():
+        hit = games[found]
+        gp = p[found]
+        flat_board = board.reshape(-1)
+        flat_territory = territory.reshape(-1)
+        # 转为一维下标，避免二维花式索引
+        base = hit * _CELLS
+        cells = _WIN_CELLS[moves[found]] + base[:, None, None]              # (h, W, 3)
+        rays = _WIN_RAYS[moves[found]] + base[:, None, None, None]          # (h, W, 2, 8)
+        threes = (flat_board[cells] == gp[:, None, None]).all(axis=2)
+
+        # 扩散只被对方棋子阻挡：沿射线累积"尚未遇到对方棋子"
+        opponent = (3 - gp)[:, None, None, None]
+        reach = np.logical_and.accumulate(flat_board[rays] != opponent, axis=3)
+        reach &= threes[:, :, None, None]
+
+        # 1. 消除三连棋子并把其位置变为当前玩家领地
+        in_three = np.broadcast_to(threes[:, :, None], cells.shape)
+        owners = np.broadcast_to(gp[:, None, None], cells.shape)[in_three]
+        flat_board[cells[in_three]] = 0
+        flat_territory[cells[in_three]] = owners
+
+        # 2. 领地沿三连两端的直线扩散
+        owners = np.broadcast_to(gp[:, None, None, None], rays.shape)[reach]
+        flat_territory[rays[reach]] = owners
+
+        # 哨兵格可能被写入，恢复为空
+        board[:, _SENTINEL] = 0
+        territory[:, _SENTINEL] = 0
+
+    turn[games] += 1
+    player[games] = 3 - p
+
+
+def _random_moves(board, territory, player, games, rng, tries=8):
+    """
+    为每局均匀随机选择一个合法落子 (内部格子编号)，无棋可下的对局返回 -1。
+    先在81格中随机抽样并拒绝非法格 (只需一次一维取值)，
+    多次未命中的少数对局再用完整的合法掩码选择。
+    """
+    flat_board = board.reshape(-1)
+    flat_territory = territory.reshape(-1)
+    moves = np.full(games.size, -1, dtype=np.intp)
+    pending = np.arange(games.size)
+
+    for _ in range(tries):
+        g = games[pending]
+        cells = _CELL_INDEX[rng.integers(0, BOARD_SIZE * BOARD_SIZE, pending.size)]
+        flat = g * _CELLS + cells
+        ok = (flat_board[flat] == 0) & (flat_territory[flat] != 3 - player[g])
+        moves[pending[ok]] = cells[ok]
+        pending = pending[~ok]
+        if pending.size == 0:
+            return moves
+
+    g = games[pending]
+    legal = (board[g] == 0) & (territory[g] != (3 - player[g])[:, None]) & _VALID
+    # 合法格子的随机键整体加1，取最大值相当于均匀随机选择一个合法落子
+    keys = rng.random(legal.shape, dtype=np.float32)
+    keys += legal
+    moves[pending] = np.where(legal.any(axis=1), keys.argmax(axis=1), -1)
+    return moves
+
+
+# --- 3. 批量随机模拟 ---
+
+def play_out(board, territory, player, turn, rng=None):
+    """
+    从给定的 N 个局面 (board / territory 形状 (N, 9, 9)) 出发，
+    同时进行随机对局直到40回合上限，返回胜者数组 (N,)。
+    1: 黑胜, 2: 白胜, 0: 平局, -1: 中途无棋可下而提前结束 (与 GameState.get_winner 一致)。
+    输入数组不会被修改。
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    b = _pad(board)
+    t = _pad(territory)
+    player = np.asarray(player, dtype=np.int8).copy()
+    turn = np.asarray(turn, dtype=np.int16).copy()
+
+    games = np.flatnonzero(turn < MAX_TURNS)
+    while games.size:
+        moves = _random_moves(b, t, player, games, rng)
+        # 无棋可下的对局停止模拟
+        has_move = moves >= 0
+        if not has_move.all():
+            games = games[has_move]
+            moves = moves[has_move]
+        apply_moves(b, t, player, turn, games, moves)
+        games = games[turn[games] < MAX_TURNS]
+
+    black = (t == 1).sum(axis=1)
+    white = (t == 2).sum(axis=1)
+    winners = np.where(black > white, 1, np.where(white > black, 2, 0))
+    winners[turn < MAX_TURNS] = -1
+    return winners
+
+
+def rollout_states(states, rng=None):
+    """对若干 GameState 各进行一局随机模拟，返回胜者列表"""
+    return play_out(*stack_states(states), rng=rng).tolist()
@@ -0,0 +1,226 @@
+"""
+引擎基准测试：固定随机种子，测量
+  - GameState.make_move / unmake_move 与 get_legal_moves 的吞吐量
+  - 两种局面引擎 (GameState / BitboardGameState) 上各模拟策略的每秒局数
+  - 不同 simulations_per_move 下 find_best_move 的耗时
+  - 一次搜索中搜索树占用的峰值内存
+结果写成 JSON，可以在不同提交之间比较；给出 --baseline 时逐项对比，
+有指标比基准差超过 --threshold 时以退出码1结束，可用于回归检查。
+
+用法: python benchmark.py --output bench.json
+      python benchmark.py --baseline bench.json --threshold 0.1
+"""
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+from bitboard import BitboardGameState
+from mcts import GameState, MCTS_AI, ROLLOUT_POLICIES
+
+# MCTS_AI(engine=...) 的名字 -> 局面类型
+ENGINES = {"list": GameState, "bitboard": BitboardGameState}
+
+# 计时的重复次数，取最快的一次，减少系统噪声的影响
+REPEAT = 5
+
+
+def _best_time(func, repeat=REPEAT) -> float:
+    """func() 多次运行中最短的耗时 (秒)"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _record_games(games: int):
+    """用当前的随机序列下 games 局随机棋，返回每局的走法列表"""
+    records = []
+    for _ in range(games):
+        game = GameState()
+        moves = []
+        while not game.is_terminal():
+            move = game.random_legal_move()
+            if move is None:
+                break
+            game.make_move(move)
+            moves.append(move)
+        records.append(moves)
+    return records
+
+
+def bench_make_move(records) -> float:
+    """按记录的走法重放整局再逐步撤销，返回每秒 make_move + unmake_move 的次数"""
+    def replay():
+        game = GameState()
+        for moves in records:
+            undo_stack = [game.make_move(move) for move in moves]
+            while undo_stack:
+                game.unmake_move(undo_stack.pop())
+
+    count = sum(len(moves) for moves in records)
+    return count / _best_time(replay)
+
+
+def bench_legal_moves(records) -> float:
+    """在记录的对局经过的每个局面上调用 get_legal_moves，返回每秒调用次数"""
+    states = []
+    for moves in records:
+        game = GameState()
+        for move in moves:
+            game.make_move(move)
+            states.append(game.clone())
+
+    def query():
+        for state in states:
+            state.get_legal_moves()
+
+    return len(states) / _best_time(query)
+
+
+def bench_playouts(engine: str, policy: str, playouts: int, seed: int) -> float:
+    """在局面引擎 engine 上从空棋盘出发按模拟策略 policy 走完 playouts 局，返回每秒局数"""
+    rollout = ROLLOUT_POLICIES[policy]
+    game = ENGINES[engine]()
+
+    def play():
+        random.seed(seed)
+        undo_stack = []
+        for _ in range(playouts):
+            rollout(game, undo_stack)
+            while undo_stack:
+                game.unmake_move(undo_stack.pop())
+
+    return playouts / _best_time(play)
+
+
+def _positions(records, turns):
+    """从记录的第一局中取出指定回合数的局面"""
+    positions = []
+    for turn in turns:
+        game = GameState()
+        for move in records[0][:turn]:
+            game.make_move(move)
+        positions.append(game)
+    return positions
+
+
+def _new_ai(simulations: int, tree="node") -> MCTS_AI:
+    """只测搜索本身：关闭一切捷径 (子树复用、开局库、终局求解)"""
+    return MCTS_AI(simulations_per_move=simulations, reuse_tree=False, tree=tree, endgame_leaves=0)
+
+
+def bench_find_best_move(positions, simulations: int, seed: int) -> float:
+    """在每个局面上各搜索一次，返回每次 find_best_move 的平均耗时 (毫秒)"""
+    ai = _new_ai(simulations)
+
+    def search():
+        random.seed(seed)
+        for state in positions:
+            ai.find_best_move(state)
+
+    return 1000 * _best_time(search, repeat=3) / len(positions)
+
+
+def bench_tree_memory(state, simulations: int, tree: str, seed: int) -> int:
+    """一次 find_best_move 期间的峰值内存增量 (字节)，主要是搜索树"""
+    ai = _new_ai(simulations, tree)
+    random.seed(seed)
+    tracemalloc.start()
+    try:
+        ai.find_best_move(state)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def run(seed=0, games=20, playouts=2000, simulations=(250, 1000, 4000), turns=(0, 10, 20, 30),
+        memory_simulations=4000):
+    """运行全部基准，返回 {指标名: {"value", "unit", "better"}}，better 为 "higher" 或 "lower" """
+    random.seed(seed)
+    records = _record_games(games)
+    metrics = {}
+
+    def add(name, value, unit, better):
+        metrics[name] = {"value": value, "unit": unit, "better": better}
+        print(f"{name:40s} {value:14.1f} {unit}")
+
+    add("make_move_per_second", bench_make_move(records), "次/秒", "higher")
+    add("get_legal_moves_per_second", bench_legal_moves(records), "次/秒", "higher")
+    for engine in ENGINES:
+        for policy in ROLLOUT_POLICIES:
+            add(f"playouts_per_second.{engine}.{policy}", bench_playouts(engine, policy, playouts, seed),
+                "局/秒", "higher")
+    positions = _positions(records, turns)
+    for count in simulations:
+        add(f"find_best_move_ms.{count}", bench_find_best_move(positions, count, seed), "毫秒", "lower")
+    for tree in ("node", "array"):
+        add(f"tree_peak_bytes.{tree}", bench_tree_memory(positions[0], memory_simulations, tree, seed),
+            "字节", "lower")
+    return metrics
+
+
+def compare(metrics: dict, baseline: dict, threshold: float):
+    """逐项与基准比较，返回比基准差超过 threshold (相对值) 的指标 [(名字, 基准值, 当前值)]"""
+    regressions = []
+    for name, current in metrics.items():
+        old = baseline.get(name)
+        if old is None or old["value"] <= 0:
+            continue
+        change = (current["value"] - old["value"]) / old["value"]
+        if current["better"] == "lower":
+            change = -change
+        print(f"{name:40s} {old['value']:14.1f} -> {current['value']:14.1f} ({change:+.1%})")
+        if change < -threshold:
+            regressions.append((name, old["value"], current["value"]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="引擎基准测试与回归检查")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    parser.add_argument("--games", type=int, default=20, help="测量落子吞吐量时重放的对局数")
+    parser.add_argument("--playouts", type=int, default=2000, help="测量模拟速度的对局数")
+    parser.add_argument("--simulations", type=int, nargs="+", default=[250, 1000, 4000],
+                        help="测量 find_best_move 耗时的每步模拟次数")
+    parser.add_argument("--memory-simulations", type=int, default=4000, help="测量搜索树内存时的模拟次数")
+    parser.add_argument("--output", default=None, help="结果写入的 JSON 文件")
+    parser.add_argument("--baseline", default=None, help="作为比较基准的 JSON 文件 (之前的 --output)")
+    parser.add_argument("--threshold", type=float, default=0.1, help="允许比基准差的比例，超过视为回归")
+    args = parser.parse_args()
+
+    metrics = run(args.seed, args.games, args.playouts, args.simulations,
+                  memory_simulations=args.memory_simulations)
+    result = {
+        "seed": args.seed,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "metrics": metrics,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"\n已写入 {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["metrics"]
+        print(f"\n--- 与 {args.baseline} 比较 (阈值 {args.threshold:.0%}) ---")
+        regressions = compare(metrics, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} 项指标回归:")
+            for name, old, new in regressions:
+                print(f"  {name}: {old:.1f} -> {new:.1f}")
+            sys.exit(1)
+        print("\n没有回归")
+
+
+if __name__ == "__main__":
+    main()
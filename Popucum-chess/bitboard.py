@@ -0,0 +1,394 @@
+import random
+from typing import List, Tuple
+
+from mcts import GameState, MCTS_AI, ROLLOUT_POLICIES, _ZOBRIST_STONE, _ZOBRIST_TERRITORY, _zobrist_after_move, _zobrist_mask, _zobrist_turn
+
+
+# --- 1. 位棋盘常量与预计算掩码 ---
+
+# 81个格子按行优先编号: idx = r * 9 + c, 第idx位代表该格子
+BOARD_SIZE = 9
+FULL_MASK = (1 << (BOARD_SIZE * BOARD_SIZE)) - 1
+
+# 编号 -> 坐标, 避免每次都重新构造元组
+_MOVES = [(r, c) for r in range(BOARD_SIZE) for c in range(BOARD_SIZE)]
+
+# 每一行的9位行掩码 -> 该行所有合法坐标, 用于快速展开合法落子列表
+_ROW_MOVES = [
+    [tuple((r, c) for c in range(BOARD_SIZE) if bits >> c & 1) for bits in range(1 << BOARD_SIZE)]
+    for r in range(BOARD_SIZE)
+]
+_ROW_SHIFTS = [(r, r * BOARD_SIZE) for r in range(BOARD_SIZE)]
+
+# 四个三连方向：横、竖、主对角线、副对角线 (与 GameState._check_for_threes 保持一致)
+_DIRECTIONS = [(0, 1), (1, 0), (1, 1), (1, -1)]
+
+# random_legal_move 先随机抽格子的次数，都不合法时改为按计数选取
+_RANDOM_PROBES = 8
+
+
+def _ray_mask(r, c, dr, dc):
+    """从(r, c)出发(不含起点)沿(dr, dc)直到边界的所有格子"""
+    mask = 0
+    r, c = r + dr, c + dc
+    while 0 <= r < BOARD_SIZE and 0 <= c < BOARD_SIZE:
+        mask |= 1 << (r * BOARD_SIZE + c)
+        r, c = r + dr, c + dc
+    return mask
+
+
+def _build_windows():
+    """
+    为每个格子预计算包含它的所有三连窗口。
+    每个窗口为 (三子掩码, 正向扩散射线, 反向扩散射线)。
+    正向射线从窗口最远端沿方向延伸，反向射线从窗口起点反向延伸。
+    """
+    windows = [[] for _ in range(BOARD_SIZE * BOARD_SIZE)]
+    for dr, dc in _DIRECTIONS:
+        for r in range(BOARD_SIZE):
+            for c in range(BOARD_SIZE):
+                end_r, end_c = r + 2 * dr, c + 2 * dc
+                if not (0 <= end_r < BOARD_SIZE and 0 <= end_c < BOARD_SIZE):
+                    continue
+                cells = [(r + i * dr, c + i * dc) for i in range(3)]
+                mask = 0
+                for pr, pc in cells:
+                    mask |= 1 << (pr * BOARD_SIZE + pc)
+                window = (mask, _ray_mask(end_r, end_c, dr, dc), _ray_mask(r, c, -dr, -dc))
+                for pr, pc in cells:
+                    windows[pr * BOARD_SIZE + pc].append(window)
+    return [tuple(w) for w in windows]
+
+
+_WINDOWS = _build_windows()
+
+
+def _clip_forward(ray, blockers):
+    """正向射线(编号递增)：截断到第一个阻挡格之前"""
+    hit = ray & blockers
+    if not hit:
+        return ray
+    return ray & ((hit & -hit) - 1)
+
+
+def _clip_backward(ray, blockers):
+    """反向射线(编号递减)：截断到第一个阻挡格之前"""
+    hit = ray & blockers
+    if not hit:
+        return ray
+    return ray & ~((1 << hit.bit_length()) - 1)
+
+
+# --- 2. 位棋盘游戏引擎 (BitboardGameState Class) ---
+
+class BitboardGameState:
+    """
+    GameState 的位棋盘实现，规则与 mcts.GameState 完全一致。
+    每个玩家的棋子和领地各用一个81位整数表示，
+    合法落子、三连检测和领地扩散都变成掩码运算。
+    可以直接传给 MCTS_AI.find_best_move 使用。
+    """
+
+    def __init__(self):
+        # 下标1: 黑方, 下标2: 白方 (下标0不使用)
+        self.stones = [0, 0, 0]
+        self.territories = [0, 0, 0]
+        self.current_player = 1
+        self.turn_count = 0
+        # Zobrist 哈希，与 GameState 使用同一组随机键，同一局面的哈希相同
+        self.zobrist = _zobrist_turn(0, 1)
+
+    def refresh(self):
+        """直接修改 stones / territories / current_player / turn_count 之后调用，重算 Zobrist 哈希"""
+        self.zobrist = self._compute_zobrist()
+
+    def _compute_zobrist(self) -> int:
+        h = _zobrist_turn(self.turn_count, self.current_player)
+        for player in (1, 2):
+            h ^= _zobrist_mask(_ZOBRIST_STONE[player], self.stones[player])
+            h ^= _zobrist_mask(_ZOBRIST_TERRITORY[player], self.territories[player])
+        return h
+
+    @classmethod
+    def from_state(cls, state: GameState):
+        """从列表实现的 GameState 转换"""
+        bb = cls()
+        for r in range(BOARD_SIZE):
+            for c in range(BOARD_SIZE):
+                bit = 1 << (r * BOARD_SIZE + c)
+                if state.board[r][c]:
+                    bb.stones[state.board[r][c]] |= bit
+                if state.territory[r][c]:
+                    bb.territories[state.territory[r][c]] |= bit
+        bb.current_player = state.current_player
+        bb.turn_count = state.turn_count
+        bb.refresh()
+        return bb
+
+    def to_state(self) -> GameState:
+        """转换回列表实现的 GameState"""
+        state = GameState()
+        state.board = self.board
+        state.territory = self.territory
+        state.current_player = self.current_player
+        state.turn_count = self.turn_count
+        state.refresh()
+        return state
+
+    @property
+    def board(self):
+        """9x9 列表形式的棋盘快照 (只读，修改不会写回)"""
+        return self._to_grid(self.stones)
+
+    @property
+    def territory(self):
+        """9x9 列表形式的领地快照 (只读，修改不会写回)"""
+        return self._to_grid(self.territories)
+
+    @staticmethod
+    def _to_grid(masks):
+        grid = [[0] * BOARD_SIZE for _ in range(BOARD_SIZE)]
+        for player in (1, 2):
+            m = masks[player]
+            while m:
+                low = m & -m
+                r, c = _MOVES[low.bit_length() - 1]
+                grid[r][c] = player
+                m ^= low
+        return grid
+
+    def clone(self):
+        """克隆当前状态，只需复制几个整数"""
+        state = BitboardGameState.__new__(BitboardGameState)
+        state.stones = self.stones[:]
+        state.territories = self.territories[:]
+        state.current_player = self.current_player
+        state.turn_count = self.turn_count
+        state.zobrist = self.zobrist
+        return state
+
+    def legal_mask(self) -> int:
+        """当前玩家的合法落子掩码：空格且不是对方领地"""
+        return FULL_MASK & ~(self.stones[1] | self.stones[2] | self.territories[3 - self.current_player])
+
+    def get_legal_moves(self) -> List[Tuple[int, int]]:
+        """获取所有合法落子点 (按行优先顺序，与 GameState 一致)"""
+        moves = []
+        m = self.legal_mask()
+        for r, shift in _ROW_SHIFTS:
+            moves.extend(_ROW_MOVES[r][m >> shift & 511])
+        return moves
+
+    def random_legal_move(self):
+        """
+        直接从合法落子掩码中随机取一个置位的格子，无处可下时返回 None。
+        随机抽一个格子，合法就直接返回；连续几次落空 (合法落子很少) 时，再按行计数取第 k 个合法格子。
+        """
+        m = self.legal_mask()
+        if not m:
+            return None
+        for _ in range(_RANDOM_PROBES):
+            idx = int(random.random() * 81)
+            if m >> idx & 1:
+                return _MOVES[idx]
+        k = random.randrange(m.bit_count())
+        for r, shift in _ROW_SHIFTS:
+            row = _ROW_MOVES[r][m >> shift & 511]
+            if k < len(row):
+                return row[k]
+            k -= len(row)
+
+    @staticmethod
+    def move_index(undo) -> int:
+        """make_move 返回的撤销记录中落子的格子编号 (记录中保存的是落子位)"""
+        return undo[0].bit_length() - 1
+
+    def three_completion(self, idx: int, owner: int) -> int:
+        """
+        与 GameState.three_completion 相同：包含格子 idx 的三连窗口中，owner 已占两格、
+        剩下一格为空且当前玩家可以落子时返回这一格的编号，没有时返回 -1。窗口顺序与 GameState 一致。
+        """
+        own = self.stones[owner]
+        blocked = self.stones[1] | self.stones[2] | self.territories[3 - self.current_player]
+        for mask, _, _ in _WINDOWS[idx]:
+            rest = mask & ~own
+            # 恰好剩一格，且这一格可以落子
+            if rest and not rest & (rest - 1) and not rest & blocked:
+                return rest.bit_length() - 1
+        return -1
+
+    def is_terminal(self) -> bool:
+        """判断游戏是否结束"""
+        return self.turn_count >= 40
+
+    def score(self) -> Tuple[int, int]:
+        """返回当前比分 (黑方领地数, 白方领地数)，直接对领地掩码计数"""
+        return self.territories[1].bit_count(), self.territories[2].bit_count()
+
+    def same_position(self, other) -> bool:
+        """判断是否与另一个状态为同一局面 (棋子、领地、行棋方、回合数都相同)"""
+        if self.zobrist != other.zobrist:
+            # 两种引擎使用同一组 Zobrist 键，哈希不同一定不是同一局面
+            return False
+        if self.current_player != other.current_player or self.turn_count != other.turn_count:
+            return False
+        if isinstance(other, BitboardGameState):
+            return self.stones == other.stones and self.territories == other.territories
+        return self.board == other.board and self.territory == other.territory
+
+    def check_consistency(self):
+        """调试用：校验掩码互不重叠、合法落子集合与掩码一致，不一致时抛出 AssertionError"""
+        assert not self.stones[1] & self.stones[2], "双方棋子重叠"
+        assert not self.territories[1] & self.territories[2], "双方领地重叠"
+        assert self.zobrist == self._compute_zobrist(), "Zobrist 哈希与重算结果不一致"
+
+    def get_winner(self) -> int:
+        """游戏结束时计算胜者。1: 黑胜, 2: 白胜, 0: 平局"""
+        if not self.is_terminal():
+            return -1  # 游戏未结束
+
+        black_score, white_score = self.score()
+
+        if black_score > white_score:
+            return 1
+        elif white_score > black_score:
+            return 2
+        else:
+            return 0
+
+    def pass_turn(self):
+        """当前玩家无棋可下时跳过回合"""
+        self.zobrist ^= _zobrist_turn(self.turn_count, self.current_player)
+        self.turn_count += 1
+        self.current_player = 3 - self.current_player
+        self.zobrist ^= _zobrist_turn(self.turn_count, self.current_player)
+
+    def make_move(self, move: Tuple[int, int]):
+        """
+        执行一步棋。三连消除和领地扩散都用掩码一次完成。
+        返回撤销记录 (落子位, 落子玩家, 落子前回合数, 被消除的棋子掩码,
+        由无主变为己方的领地掩码, 由对方变为己方的领地掩码, 落子前的哈希)；非法移动返回 None。
+        """
+        r, c = move
+        if not (0 <= r < BOARD_SIZE and 0 <= c < BOARD_SIZE):
+            return None
+        idx = r * BOARD_SIZE + c
+        bit = 1 << idx
+        if (self.stones[1] | self.stones[2]) & bit:
+            # 非法移动，理论上不应发生
+            return None
+
+        player = self.current_player
+        own = self.stones[player] | bit
+
+        # 检查包含新子的所有三连窗口
+        cleared = 0
+        gained = 0
+        from_empty = 0
+        from_opponent = 0
+        blockers = self.stones[3 - player]
+        for mask, forward, backward in _WINDOWS[idx]:
+            if own & mask == mask:
+                cleared |= mask
+                # 扩散只被对方棋子阻挡，与处理顺序无关，可以直接合并
+                gained |= _clip_forward(forward, blockers) | _clip_backward(backward, blockers)
+
+        if cleared:
+            gained |= cleared
+            own &= ~cleared
+            own_territory = self.territories[player]
+            opponent_territory = self.territories[3 - player]
+            from_opponent = gained & opponent_territory
+            from_empty = gained & ~own_territory & ~opponent_territory
+            self.territories[player] = own_territory | gained
+            self.territories[3 - player] = opponent_territory & ~gained
+
+        self.stones[player] = own
+        undo = (bit, player, self.turn_count, cleared, from_empty, from_opponent, self.zobrist)
+        self.zobrist = _zobrist_after_move(self.zobrist, idx, player, self.turn_count,
+                                           cleared, from_empty, from_opponent)
+
+        # 更新回合和玩家
+        self.turn_count += 1
+        self.current_player = 3 - player
+        return undo
+
+    def unmake_move(self, undo):
+        """根据 make_move 返回的撤销记录恢复到落子前的状态"""
+        if undo is None:
+            return
+        bit, player, turn_count, cleared, from_empty, from_opponent, zobrist = undo
+
+        self.stones[player] = (self.stones[player] | cleared) & ~bit
+        if from_empty or from_opponent:
+            self.territories[player] &= ~(from_empty | from_opponent)
+            self.territories[3 - player] |= from_opponent
+
+        self.turn_count = turn_count
+        self.current_player = player
+        self.zobrist = zobrist
+
+    def display(self):
+        """打印棋盘，方便调试"""
+        self.to_state().display()
+
+
+# --- 3. 与 GameState 的一致性检查 ---
+
+def check_against_state(games=20, simulations=200, seed=0):
+    """
+    BitboardGameState 可以替换 GameState：每种模拟策略在位棋盘上从随机局面走完一局，
+    把同样的走法在 GameState 上重放，逐步比较 Zobrist 哈希 (两种引擎使用同一组随机键)
+    和双方的补三连格子，终局的胜者也必须相同；回退后增量维护的数据仍然一致。
+    两种引擎抽取随机落子的方式不同，相同种子下走出的对局不同，所以按走法重放而不是比较两局。
+    最后确认 MCTS_AI 在位棋盘上选出合法走法。不一致时抛出 AssertionError。
+    """
+    for name in ROLLOUT_POLICIES:
+        rollout = ROLLOUT_POLICIES[name]
+        for game in range(games):
+            random.seed(seed + game)
+            bitboard = BitboardGameState()
+            # 随机前缀的撤销记录也留在栈中，供依赖最近落子的策略使用
+            undo_stack = []
+            for _ in range(random.randrange(40)):
+                move = bitboard.random_legal_move()
+                if move is None:
+                    break
+                undo_stack.append(bitboard.make_move(move))
+            winner = rollout(bitboard, undo_stack)
+            moves = [_MOVES[bitboard.move_index(undo)] for undo in undo_stack]
+
+            state = GameState()
+            state_undo = []
+            while undo_stack:
+                bitboard.unmake_move(undo_stack.pop())
+            for move in moves:
+                # 落子前检查：两种引擎给出的合法落子和补三连格子相同
+                assert state.get_legal_moves() == bitboard.get_legal_moves(), f"模拟策略 {name} 第 {game} 局合法落子不一致"
+                idx = move[0] * 9 + move[1]
+                for owner in (1, 2):
+                    assert state.three_completion(idx, owner) == bitboard.three_completion(idx, owner), \
+                        f"模拟策略 {name} 第 {game} 局补三连格子不一致"
+                state_undo.append(state.make_move(move))
+                undo_stack.append(bitboard.make_move(move))
+                assert state.zobrist == bitboard.zobrist, f"模拟策略 {name} 第 {game} 局落子 {move} 后局面不一致"
+            assert state.get_winner() == winner == bitboard.get_winner(), f"模拟策略 {name} 第 {game} 局胜者不一致"
+
+            while undo_stack:
+                bitboard.unmake_move(undo_stack.pop())
+                state.unmake_move(state_undo.pop())
+                assert state.zobrist == bitboard.zobrist, f"模拟策略 {name} 第 {game} 局回退后局面不一致"
+            state.check_consistency()
+            bitboard.check_consistency()
+
+        bitboard = BitboardGameState()
+        for move in moves[:10]:
+            bitboard.make_move(move)
+        random.seed(seed)
+        move = MCTS_AI(simulations_per_move=simulations, rollout=name).find_best_move(bitboard)
+        assert move in bitboard.get_legal_moves(), f"模拟策略 {name} 下 MCTS_AI 在位棋盘上选出了非法走法"
+
+
+if __name__ == "__main__":
+    check_against_state()
+    print("BitboardGameState 与 GameState 一致")
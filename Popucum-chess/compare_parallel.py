@@ -0,0 +1,96 @@
+"""
+树并行与根并行的对比：相同进程数、相同模拟次数下双方对弈，轮流执黑，
+统计胜负和平均每步用时，据此比较单位时间内的走法质量。
+
+用法: python compare_parallel.py --games 20 --workers 4 --simulations 4000
+"""
+import argparse
+import random
+import time
+
+from mcts import GameState, MCTS_AI
+
+
+def play_game(black_ai: MCTS_AI, white_ai: MCTS_AI, think_time: dict) -> int:
+    """进行一局对弈，返回胜者 (1: 黑胜, 2: 白胜, 0: 平局)，每步用时累加到 think_time[ai]"""
+    game = GameState()
+    ais = {1: black_ai, 2: white_ai}
+    while not game.is_terminal():
+        ai = ais[game.current_player]
+        start = time.perf_counter()
+        move = ai.find_best_move(game)
+        seconds, moves = think_time[ai]
+        think_time[ai] = (seconds + time.perf_counter() - start, moves + 1)
+
+        if move is None:
+            # 无棋可下，跳过回合
+            game.pass_turn()
+        else:
+            game.make_move(move)
+    return game.get_winner()
+
+
+def compare(games=20, workers=4, simulations=4000, batch_size=1, seed=None):
+    """树并行对根并行进行 games 局对弈，返回统计结果"""
+    if seed is not None:
+        random.seed(seed)
+    # 根并行不保留搜索树，树并行也关闭子树复用，双方每步都只有这 simulations 次模拟
+    tree_ai = MCTS_AI(simulations_per_move=simulations, batch_size=batch_size, workers=workers, parallel="tree",
+                      reuse_tree=False)
+    root_ai = MCTS_AI(simulations_per_move=simulations, batch_size=batch_size, workers=workers, parallel="root",
+                      reuse_tree=False)
+    think_time = {tree_ai: (0.0, 0), root_ai: (0.0, 0)}
+    results = {"tree": 0, "root": 0, "draw": 0}
+
+    try:
+        for i in range(games):
+            # 轮流执黑，抵消先手优势
+            if i % 2 == 0:
+                winner = play_game(tree_ai, root_ai, think_time)
+                tree_color = 1
+            else:
+                winner = play_game(root_ai, tree_ai, think_time)
+                tree_color = 2
+
+            if winner == 0:
+                results["draw"] += 1
+            elif winner == tree_color:
+                results["tree"] += 1
+            else:
+                results["root"] += 1
+            print(f"第 {i + 1}/{games} 局: 树并行 {results['tree']} 胜 / 根并行 {results['root']} 胜 / 平局 {results['draw']}")
+    finally:
+        tree_ai.close()
+        root_ai.close()
+
+    for name, ai in (("tree", tree_ai), ("root", root_ai)):
+        seconds, moves = think_time[ai]
+        results[f"{name}_seconds_per_move"] = seconds / max(moves, 1)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="树并行 vs 根并行 对比")
+    parser.add_argument("--games", type=int, default=20, help="对局数")
+    parser.add_argument("--workers", type=int, default=4, help="双方使用的进程数")
+    parser.add_argument("--simulations", type=int, default=4000, help="每步模拟次数")
+    parser.add_argument("--batch-size", type=int, default=1, help="每批模拟的叶子数 (>1 需要 numpy)")
+    parser.add_argument("--seed", type=int, default=None, help="随机种子")
+    args = parser.parse_args()
+
+    results = compare(args.games, args.workers, args.simulations, args.batch_size, args.seed)
+
+    decided = results["tree"] + results["root"]
+    score = (results["tree"] + 0.5 * results["draw"]) / max(args.games, 1)
+    print("\n--- 对比结果 ---")
+    print(f"树并行: {results['tree']} 胜, 根并行: {results['root']} 胜, 平局: {results['draw']} (分出胜负 {decided} 局)")
+    print(f"树并行得分率: {score:.1%}")
+    print(f"平均每步用时: 树并行 {results['tree_seconds_per_move']:.3f}s, "
+          f"根并行 {results['root_seconds_per_move']:.3f}s")
+    # 单位时间的走法质量：得分率相同时用时更短者更优，用时相同时得分率更高者更优
+    ratio = results["root_seconds_per_move"] / max(results["tree_seconds_per_move"], 1e-9)
+    print(f"树并行相对速度: {ratio:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+模拟策略的对比：启发式模拟 (HeuristicRollout) 对随机模拟，双方每步思考时间相同，轮流执黑，
+统计胜负和每秒模拟次数，据此比较单位 CPU 时间内的棋力。
+
+用法: python compare_rollout.py --games 20 --think-time-ms 200 --epsilon 0.1
+"""
+import argparse
+import random
+
+from compare_parallel import play_game
+from mcts import MCTS_AI, ROLLOUT_POLICIES, HeuristicRollout
+
+
+class _CountingRollout:
+    """包装一个模拟策略，统计调用次数"""
+
+    def __init__(self, rollout):
+        self.rollout = rollout
+        self.calls = 0
+
+    def __call__(self, state, undo_stack):
+        self.calls += 1
+        return self.rollout(state, undo_stack)
+
+
+def compare(games=20, think_time_ms=200, epsilon=0.1, seed=None):
+    """启发式模拟对随机模拟进行 games 局对弈，返回统计结果"""
+    if seed is not None:
+        random.seed(seed)
+    heuristic = _CountingRollout(HeuristicRollout(epsilon))
+    uniform = _CountingRollout(ROLLOUT_POLICIES["random"])
+    heuristic_ai = MCTS_AI(think_time_ms=think_time_ms, rollout=heuristic, reuse_tree=False)
+    random_ai = MCTS_AI(think_time_ms=think_time_ms, rollout=uniform, reuse_tree=False)
+    think_time = {heuristic_ai: (0.0, 0), random_ai: (0.0, 0)}
+    results = {"heuristic": 0, "random": 0, "draw": 0}
+
+    for i in range(games):
+        # 轮流执黑，抵消先手优势
+        if i % 2 == 0:
+            winner = play_game(heuristic_ai, random_ai, think_time)
+            heuristic_color = 1
+        else:
+            winner = play_game(random_ai, heuristic_ai, think_time)
+            heuristic_color = 2
+
+        if winner == 0:
+            results["draw"] += 1
+        elif winner == heuristic_color:
+            results["heuristic"] += 1
+        else:
+            results["random"] += 1
+        print(f"第 {i + 1}/{games} 局: 启发式 {results['heuristic']} 胜 / 随机 {results['random']} 胜 / 平局 {results['draw']}")
+
+    for name, ai, counter in (("heuristic", heuristic_ai, heuristic), ("random", random_ai, uniform)):
+        seconds, moves = think_time[ai]
+        results[f"{name}_seconds_per_move"] = seconds / max(moves, 1)
+        results[f"{name}_rollouts_per_second"] = counter.calls / max(seconds, 1e-9)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="启发式模拟 vs 随机模拟 对比")
+    parser.add_argument("--games", type=int, default=20, help="对局数")
+    parser.add_argument("--think-time-ms", type=int, default=200, help="双方每步的思考时间 (毫秒)")
+    parser.add_argument("--epsilon", type=float, default=0.1, help="启发式模拟中随机落子的概率")
+    parser.add_argument("--seed", type=int, default=None, help="随机种子")
+    args = parser.parse_args()
+
+    results = compare(args.games, args.think_time_ms, args.epsilon, args.seed)
+
+    score = (results["heuristic"] + 0.5 * results["draw"]) / max(args.games, 1)
+    print("\n--- 对比结果 ---")
+    print(f"启发式: {results['heuristic']} 胜, 随机: {results['random']} 胜, 平局: {results['draw']}")
+    print(f"启发式得分率 (相同思考时间): {score:.1%}")
+    print(f"平均每步用时: 启发式 {results['heuristic_seconds_per_move']:.3f}s, "
+          f"随机 {results['random_seconds_per_move']:.3f}s")
+    print(f"每秒模拟次数: 启发式 {results['heuristic_rollouts_per_second']:.0f}, "
+          f"随机 {results['random_rollouts_per_second']:.0f}")
+
+
+if __name__ == "__main__":
+    main()
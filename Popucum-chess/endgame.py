@@ -0,0 +1,157 @@
+"""
+终局精确求解：对局固定在第40回合结束，最后几手的局面小到可以穷举。
+对 GameState (或 BitboardGameState) 做 alpha-beta (negamax) 搜索，求出按最终胜负最优的走法，
+局面的结果按 Zobrist 哈希记入备忘表，不同走法顺序到达的同一局面只搜索一次。
+可以给出截止时间和停止信号，超时或收到信号时放弃求解，由调用方改用其他搜索。
+"""
+import time
+from typing import Optional, Tuple
+
+MAX_TURNS = 40
+
+# 以行棋方为准的结果
+WIN, DRAW, LOSS = 1, 0, -1
+
+# 备忘表中的值是精确值、下界 (发生了 beta 截断) 还是上界 (没有走法超过 alpha)
+_EXACT, _LOWER, _UPPER = 0, 1, 2
+
+# 每搜索这么多个局面检查一次截止时间和停止信号
+CHECK_INTERVAL = 256
+
+
+class _Aborted(Exception):
+    """超过截止时间或收到停止信号，放弃求解"""
+
+
+def estimated_leaves(state) -> int:
+    """不剪枝时需要搜索的终局局面数的估计：当前合法落子数的 剩余手数 次方"""
+    remaining = MAX_TURNS - state.turn_count
+    if remaining <= 0:
+        return 1
+    return len(state.get_legal_moves()) ** remaining
+
+
+def _result(state) -> int:
+    """终局时行棋方的胜负"""
+    black, white = state.score()
+    diff = black - white if state.current_player == 1 else white - black
+    return (diff > 0) - (diff < 0)
+
+
+class EndgameSolver:
+    """
+    带备忘表的 alpha-beta 求解器。
+    走法排序：备忘表中记录的最佳走法最先，其余按落子后的领地差从大到小 (能成三连的走法排在前面)。
+    备忘表在多次求解之间保留，超过 max_entries 个局面时清空。
+    """
+
+    def __init__(self, max_entries=1_000_000):
+        self.max_entries = max_entries
+        # 哈希 -> (值, 类型, 最佳走法)
+        self.memo = {}
+        # 上一次求解访问的局面数
+        self.nodes = 0
+        self._deadline = None
+        self._stop = None
+
+    def solve(self, state, deadline=None, stop=None) -> Tuple[Optional[Tuple[int, int]], Optional[int]]:
+        """
+        返回 (最佳走法, 结果)，结果为行棋方在双方都正确应对时的胜负 (WIN / DRAW / LOSS)。
+        state 在搜索中原地推进和回退，结束后恢复原状；无棋可下或已经终局时走法为 None。
+        deadline (time.perf_counter() 的时刻) 已过或 stop (threading.Event) 被设置时放弃求解，
+        返回 (None, None)；备忘表只记录搜索完整的局面，放弃后仍然有效。
+        """
+        self.nodes = 0
+        if len(self.memo) > self.max_entries:
+            self.memo.clear()
+        if state.is_terminal():
+            return None, _result(state)
+        self._deadline, self._stop = deadline, stop
+        try:
+            value = self._negamax(state, LOSS, WIN)
+        except _Aborted:
+            return None, None
+        finally:
+            self._deadline = self._stop = None
+        entry = self.memo.get(state.zobrist)
+        return (entry[2] if entry is not None else None), value
+
+    def _check_abort(self):
+        if self._deadline is not None and time.perf_counter() >= self._deadline:
+            raise _Aborted
+        if self._stop is not None and self._stop.is_set():
+            raise _Aborted
+
+    def _ordered_moves(self, state, hint):
+        """按落子后行棋方的领地差从大到小排列合法落子，hint 排在最前面"""
+        player = state.current_player
+        scored = []
+        for move in state.get_legal_moves():
+            if move == hint:
+                continue
+            undo = state.make_move(move)
+            black, white = state.score()
+            state.unmake_move(undo)
+            scored.append((black - white if player == 1 else white - black, move))
+        scored.sort(key=lambda item: item[0], reverse=True)
+        moves = [move for _, move in scored]
+        if hint is not None:
+            moves.insert(0, hint)
+        return moves
+
+    def _negamax(self, state, alpha: int, beta: int) -> int:
+        self.nodes += 1
+        if self.nodes % CHECK_INTERVAL == 0:
+            self._check_abort()
+        if state.is_terminal():
+            return _result(state)
+
+        key = state.zobrist
+        hint = None
+        entry = self.memo.get(key)
+        if entry is not None:
+            value, flag, hint = entry
+            if flag == _EXACT:
+                return value
+            if flag == _LOWER:
+                alpha = max(alpha, value)
+            else:
+                beta = min(beta, value)
+            if alpha >= beta:
+                return value
+
+        if state.turn_count == MAX_TURNS - 1:
+            # 最后一手直接得到终局，排序没有意义
+            moves = state.get_legal_moves()
+        else:
+            moves = self._ordered_moves(state, hint)
+        if not moves:
+            # 无棋可下，跳过回合 (很少发生，复制一份状态即可)
+            child = state.clone()
+            child.pass_turn()
+            return -self._negamax(child, -beta, -alpha)
+
+        original_alpha = alpha
+        best, best_move = LOSS - 1, None
+        for move in moves:
+            undo = state.make_move(move)
+            try:
+                value = -self._negamax(state, -beta, -alpha)
+            finally:
+                # 放弃求解时同样逐层回退，state 恢复原状
+                state.unmake_move(undo)
+            if value > best:
+                best, best_move = value, move
+                if value > alpha:
+                    alpha = value
+                    if alpha >= beta:
+                        break
+
+        if best <= original_alpha:
+            flag = _UPPER
+        elif best >= beta:
+            flag = _LOWER
+        else:
+            flag = _EXACT
+        self.memo[key] = (best, flag, best_move)
+        return best
@@ -1,8 +1,20 @@
 import tkinter as tk
-from tkinter import messagebox, Button, Frame, Canvas, Label, Scale, IntVar
+from tkinter import messagebox, Button, Frame, Canvas, Label, Scale, IntVar, BooleanVar, Checkbutton
 from tkinter import font as tkFont  # 导入tkinter.font
 import math # 添加 math 模块导入
-from mcts import GameState, MCTS_AI
+import os
+import queue
+import threading
+from mcts import GameState, MCTS_AI, SearchBudget
+
+# 后台思考的模拟次数上限，玩家长考时搜索树不会无限增长
+PONDER_MAX_SIMULATIONS = 200000
+# 后台思考期间刷新侧边栏的间隔 (毫秒)
+PONDER_REFRESH_MS = 250
+# AI搜索期间检查进度队列的间隔 (毫秒)
+SEARCH_POLL_MS = 100
+# 开局库文件
+OPENING_BOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "opening_book.bin")
 
 class GameGUI:
     def __init__(self, root):
@@ -37,15 +49,33 @@ class GameGUI:
         # 游戏状态
         self.game = GameState()
         self.ai_strength = IntVar(value=1000)
-        self.ai = MCTS_AI(simulations_per_move=self.ai_strength.get())
+        # 置换表容量按滑块最大模拟次数估计，保留的搜索树跨步复用时也足够；
+        # 脚本目录下有开局库 (python opening_book.py 生成) 时一并加载；
+        # 模拟用启发式策略，相同思考时间下比随机模拟强 (见 compare_rollout.py)；
+        # 搜索在位棋盘引擎上进行，规则相同，模拟更快 (见 benchmark.py)；
+        # 搜索统计的开销可以忽略，始终开启并显示在侧栏
+        book = OPENING_BOOK_PATH if os.path.exists(OPENING_BOOK_PATH) else None
+        self.ai = MCTS_AI(simulations_per_move=self.ai_strength.get(), transposition_size=100000,
+                          opening_book=book, rollout="heuristic", collect_stats=True, stats_interval=500,
+                          engine="bitboard")
         self.ai_player = 2
         self.game_over = False
+        # 后台思考：玩家思考期间AI在后台线程中继续搜索
+        self.ponder_enabled = BooleanVar(value=True)
+        self.ponder_thread = None
+        self.ponder_budget = None
+        # AI搜索在工作线程中进行，进度和结果通过队列传回主线程
+        self.search_thread = None
+        self.search_stop = None
 
         # 棋盘尺寸
         self.cell_size = 55  # 稍微增大格子尺寸
         self.board_padding = 35 # 增加棋盘边距
         self.board_size = 9
         self.stone_radius_ratio = 0.4 # 棋子半径占格子大小的比例
+        # 每个格子保留的 (领地方块, 棋子) 图元编号，以及上次绘制的内容，第一次绘制时创建
+        self.cell_items = None
+        self.drawn_cells = None
 
         # 创建UI元素
         self.create_widgets()
@@ -56,6 +86,8 @@ class GameGUI:
         # 如果AI是黑方(先手)，则让AI先走
         if self.ai_player == 1:
             self.root.after(500, self.ai_move)
+        else:
+            self.start_pondering()
 
     def create_widgets(self):
         # --- 主框架 ---
@@ -138,6 +170,47 @@ class GameGUI:
         )
         self.ai_info_label.pack(pady=(0,5))
 
+        self.ponder_check = Checkbutton(
+            self.ai_control_frame,
+            text="后台思考",
+            variable=self.ponder_enabled,
+            command=self.toggle_pondering,
+            font=self.fonts["info"],
+            fg=self.colors["text_color"],
+            bg=self.colors["light_bg"], # 使用浅色背景
+            activebackground=self.colors["light_bg"]
+        )
+        self.ponder_check.pack(anchor=tk.W, padx=10)
+
+        self.ponder_label = Label(
+            self.ai_control_frame,
+            text="后台思考: 等待中",
+            font=self.fonts["info"],
+            fg=self.colors["text_color"],
+            bg=self.colors["light_bg"] # 使用浅色背景
+        )
+        self.ponder_label.pack(pady=(0,5))
+
+        self.search_label = Label(
+            self.ai_control_frame,
+            text="",
+            font=self.fonts["info"],
+            fg=self.colors["text_color"],
+            bg=self.colors["light_bg"], # 使用浅色背景
+            justify=tk.LEFT
+        )
+        self.search_label.pack(pady=(0,5))
+
+        self.stats_label = Label(
+            self.ai_control_frame,
+            text="",
+            font=self.fonts["info"],
+            fg=self.colors["text_color"],
+            bg=self.colors["light_bg"], # 使用浅色背景
+            justify=tk.LEFT
+        )
+        self.stats_label.pack(pady=(0,5))
+
         # --- 控制按钮 ---
         self.button_frame = Frame(self.control_frame, bg=self.colors["light_bg"]) # 使用浅色背景
         self.button_frame.pack(pady=15, fill=tk.X)
@@ -200,7 +273,8 @@ class GameGUI:
 
     def update_ai_strength(self, _=None):
         strength = self.ai_strength.get()
-        self.ai = MCTS_AI(simulations_per_move=strength)
+        # 只修改模拟次数，保留AI在本局中积累的搜索树
+        self.ai.simulations_per_move = strength
         self.ai_info_label.config(text=f"当前模拟次数: {strength}")
 
         # 提供一些关于AI强度的反馈
@@ -216,6 +290,25 @@ class GameGUI:
         self.ai_info_label.config(text=f"当前模拟: {strength} ({difficulty})", font=self.fonts["info"])
 
     def draw_board(self):
+        """
+        增量重绘：静态网格只在第一次调用时绘制，每个格子的领地方块和棋子在第一次调用时创建并保留，
+        之后只与上次绘制的内容比较，修改发生变化的格子。
+        """
+        if self.cell_items is None:
+            self.create_board_items()
+
+        for r in range(self.board_size):
+            board_row = self.game.board[r]
+            territory_row = self.game.territory[r]
+            drawn_row = self.drawn_cells[r]
+            for c in range(self.board_size):
+                cell = (board_row[c], territory_row[c])
+                if drawn_row[c] != cell:
+                    self.update_cell(r, c, *cell)
+                    drawn_row[c] = cell
+
+    def create_board_items(self):
+        """绘制静态网格和星位，并为每个格子创建 (领地方块, 棋子) 两个初始隐藏的图元"""
         self.canvas.delete("all")
 
         # 绘制棋盘网格线 (board_size x board_size 个格子)
@@ -225,14 +318,14 @@ class GameGUI:
             self.canvas.create_line(
                 self.board_padding, y_coord,
                 self.board_padding + self.board_size * self.cell_size, y_coord,
-                fill="black"
+                fill="black", tags="grid"
             )
             # 竖线
             x_coord = self.board_padding + i * self.cell_size
             self.canvas.create_line(
                 x_coord, self.board_padding,
                 x_coord, self.board_padding + self.board_size * self.cell_size,
-                fill="black"
+                fill="black", tags="grid"
             )
 
         # 绘制星位 (仍然在交叉点上作为视觉标记)
@@ -250,49 +343,59 @@ class GameGUI:
             if c_star < self.board_size and r_star < self.board_size :
                  self.canvas.create_oval(
                     x_intersect - 3, y_intersect - 3, x_intersect + 3, y_intersect + 3,
-                    fill="black", outline="black"
+                    fill="black", outline="black", tags="grid"
                 )
 
-        # 绘制领地和棋子 (在格内)
+        # 领地方块全部创建在棋子之前，保证棋子始终显示在领地上方
+        stone_radius = self.cell_size * self.stone_radius_ratio
+        rects = []
         for r in range(self.board_size):
             for c in range(self.board_size):
-                # 格子左上角坐标
+                # 格子左上角和右下角坐标
                 x1_cell = self.board_padding + c * self.cell_size
                 y1_cell = self.board_padding + r * self.cell_size
-                # 格子右下角坐标
-                x2_cell = x1_cell + self.cell_size
-                y2_cell = y1_cell + self.cell_size
+                rects.append(self.canvas.create_rectangle(
+                    x1_cell, y1_cell, x1_cell + self.cell_size, y1_cell + self.cell_size,
+                    outline="", state=tk.HIDDEN, tags="territory"
+                ))
+        self.cell_items = []
+        for r in range(self.board_size):
+            row = []
+            for c in range(self.board_size):
                 # 格子中心坐标 (用于棋子)
-                x_cell_center = x1_cell + self.cell_size / 2
-                y_cell_center = y1_cell + self.cell_size / 2
-
-                stone_radius = self.cell_size * self.stone_radius_ratio
-
-                # 绘制领地 (填充整个格子)
-                if self.game.territory[r][c] == 1:  # 黑方领地
-                    self.canvas.create_rectangle(
-                        x1_cell, y1_cell, x2_cell, y2_cell,
-                        fill=self.colors["black_territory"], outline="", tags="territory"
-                    )
-                elif self.game.territory[r][c] == 2:  # 白方领地
-                    self.canvas.create_rectangle(
-                        x1_cell, y1_cell, x2_cell, y2_cell,
-                        fill=self.colors["white_territory"], outline="", tags="territory"
-                    )
-
-                # 绘制棋子 (在格子中心)
-                if self.game.board[r][c] == 1:  # 黑棋
-                    self.canvas.create_oval(
-                        x_cell_center - stone_radius, y_cell_center - stone_radius,
-                        x_cell_center + stone_radius, y_cell_center + stone_radius,
-                        fill=self.colors["black_stone"], outline=self.colors["black_stone"], tags="piece"
-                    )
-                elif self.game.board[r][c] == 2:  # 白棋
-                    self.canvas.create_oval(
-                        x_cell_center - stone_radius, y_cell_center - stone_radius,
-                        x_cell_center + stone_radius, y_cell_center + stone_radius,
-                        fill=self.colors["white_stone"], outline="black", tags="piece"
-                    )
+                x_cell_center = self.board_padding + c * self.cell_size + self.cell_size / 2
+                y_cell_center = self.board_padding + r * self.cell_size + self.cell_size / 2
+                stone = self.canvas.create_oval(
+                    x_cell_center - stone_radius, y_cell_center - stone_radius,
+                    x_cell_center + stone_radius, y_cell_center + stone_radius,
+                    state=tk.HIDDEN, tags="piece"
+                )
+                row.append((rects[r * self.board_size + c], stone))
+            self.cell_items.append(row)
+
+        # 上次绘制的 (棋子, 领地)，全部为空与隐藏的图元一致
+        self.drawn_cells = [[(0, 0)] * self.board_size for _ in range(self.board_size)]
+
+    def update_cell(self, r, c, stone, owner):
+        """按格子的棋子和领地修改对应的两个图元"""
+        rect, oval = self.cell_items[r][c]
+
+        # 领地 (填充整个格子)
+        if owner == 1:  # 黑方领地
+            self.canvas.itemconfigure(rect, fill=self.colors["black_territory"], state=tk.NORMAL)
+        elif owner == 2:  # 白方领地
+            self.canvas.itemconfigure(rect, fill=self.colors["white_territory"], state=tk.NORMAL)
+        else:
+            self.canvas.itemconfigure(rect, state=tk.HIDDEN)
+
+        # 棋子 (在格子中心)
+        if stone == 1:  # 黑棋
+            self.canvas.itemconfigure(oval, fill=self.colors["black_stone"], outline=self.colors["black_stone"],
+                                      state=tk.NORMAL)
+        elif stone == 2:  # 白棋
+            self.canvas.itemconfigure(oval, fill=self.colors["white_stone"], outline="black", state=tk.NORMAL)
+        else:
+            self.canvas.itemconfigure(oval, state=tk.HIDDEN)
 
     def on_board_click(self, event):
         if self.game_over or self.game.current_player == self.ai_player:
@@ -307,7 +410,12 @@ class GameGUI:
         if 0 <= r < self.board_size and 0 <= c < self.board_size:
             if self.game.board[r][c] == 0 and \
                (self.game.territory[r][c] == 0 or self.game.territory[r][c] == self.game.current_player):
+                pondered = self.stop_pondering()
                 self.game.make_move((r, c))
+                # 把后台思考得到的、与玩家落子对应的子树提升为树根
+                reused = self.ai.follow(self.game)
+                if pondered:
+                    self.ponder_label.config(text=f"后台思考: {pondered} 次模拟\n沿用 {reused} 次访问")
                 self.draw_board()
                 self.update_info()
 
@@ -323,33 +431,129 @@ class GameGUI:
         player_text = "黑方 (●)" if self.game.current_player == 1 else "白方 (○)"
         self.player_label.config(text=f"当前玩家: {player_text}", font=self.fonts["label"])
 
-        black_score = sum(row.count(1) for row in self.game.territory)
-        white_score = sum(row.count(2) for row in self.game.territory)
+        black_score, white_score = self.game.score()
         self.score_label.config(text=f"比分: 黑方 {black_score} vs 白方 {white_score}", font=self.fonts["label"])
 
     def ai_move(self):
         if self.game_over:
             return
+        self.cancel_ai_search()
+        self.stop_pondering()
 
         print(f"AI (Player {self.ai_player}) is thinking...")
-        # AI计算最佳走法
-        best_move = self.ai.find_best_move(self.game)
+        self.search_label.config(text="AI 思考中...")
+        # AI在工作线程中计算最佳走法 (会沿用上一步保留的搜索树中与玩家落子对应的子树)，
+        # 主线程只负责轮询队列，窗口保持响应
+        results = queue.Queue()
+        stop = threading.Event()
+        state = self.game.clone()
+
+        def on_progress(done, stats):
+            move, visits, wins = max(stats, key=lambda s: s[1])
+            results.put(("progress", (done, move, wins / visits if visits else 0.0)))
+
+        def on_stats(stats):
+            results.put(("stats", stats.summary()))
+
+        def search():
+            best_move = self.ai.find_best_move(state, stop=stop, on_progress=on_progress, on_stats=on_stats)
+            results.put(("done", best_move))
+
+        self.search_stop = stop
+        self.search_thread = threading.Thread(target=search, daemon=True)
+        self.search_thread.start()
+        self.root.after(SEARCH_POLL_MS, self.poll_ai_search, self.search_thread, results)
+
+    def poll_ai_search(self, thread, results):
+        """在主线程中处理工作线程发来的进度和结果，thread 被取消或替换后停止轮询"""
+        if thread is not self.search_thread:
+            return
+        while True:
+            try:
+                kind, payload = results.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "progress":
+                done, move, win_rate = payload
+                self.search_label.config(text=f"AI 思考中: {done} 次模拟\n最佳 {move}, 胜率 {win_rate:.0%}")
+            elif kind == "stats":
+                self.stats_label.config(text=payload)
+            else:
+                thread.join()
+                self.search_thread = None
+                self.search_stop = None
+                self.finish_ai_move(payload)
+                return
+        self.root.after(SEARCH_POLL_MS, self.poll_ai_search, thread, results)
 
+    def cancel_ai_search(self):
+        """取消进行中的AI搜索并等待工作线程结束 (最多一次模拟的时间)"""
+        if self.search_thread is None:
+            return
+        self.search_stop.set()
+        self.search_thread.join()
+        self.search_thread = None
+        self.search_stop = None
+        self.search_label.config(text="")
+
+    def finish_ai_move(self, best_move):
+        """在主线程中执行AI选出的走法"""
+        self.search_label.config(text=f"AI 落子: {best_move}" if best_move is not None else "AI 无棋可下")
+        # 开局库或终局求解直接给出走法时没有搜索统计
+        stats = self.ai.last_stats
+        self.stats_label.config(text=stats.summary() if stats is not None else "")
         if best_move is None:
             # AI无棋可下，跳过回合
-            self.game.turn_count += 1
-            self.game.current_player = 3 - self.game.current_player
+            self.game.pass_turn()
         else:
             # 执行AI走法
             self.game.make_move(best_move)
 
         # 重绘棋盘
         self.draw_board()
+        self.update_info()
 
         # 检查游戏是否结束
         if self.game.is_terminal():
             self.game_over = True
             self.show_game_result()
+        else:
+            self.start_pondering()
+
+    def start_pondering(self):
+        """轮到玩家时，让AI在后台线程中继续搜索当前局面"""
+        if not self.ponder_enabled.get() or self.game_over or self.game.current_player == self.ai_player:
+            return
+        self.stop_pondering()
+        self.ponder_budget = SearchBudget(PONDER_MAX_SIMULATIONS, early_stop=False, stop=threading.Event())
+        self.ponder_thread = threading.Thread(
+            target=self.ai.ponder, args=(self.game.clone(), self.ponder_budget), daemon=True)
+        self.ponder_thread.start()
+        self.root.after(PONDER_REFRESH_MS, self.update_ponder_info, self.ponder_thread)
+
+    def stop_pondering(self) -> int:
+        """停止后台思考并等待线程结束 (最多一次模拟的时间)，返回后台完成的模拟次数"""
+        if self.ponder_thread is None:
+            return 0
+        self.ponder_budget.stop.set()
+        self.ponder_thread.join()
+        self.ponder_thread = None
+        return self.ponder_budget.done
+
+    def toggle_pondering(self):
+        if self.ponder_enabled.get():
+            self.start_pondering()
+        else:
+            self.stop_pondering()
+            self.ponder_label.config(text="后台思考: 关闭")
+
+    def update_ponder_info(self, thread):
+        """后台思考期间定时刷新侧边栏中的模拟次数，thread 结束或被替换后停止刷新"""
+        if thread is not self.ponder_thread:
+            return
+        self.ponder_label.config(text=f"后台思考: {self.ponder_budget.done} 次模拟")
+        if thread.is_alive():
+            self.root.after(PONDER_REFRESH_MS, self.update_ponder_info, thread)
 
     def show_game_result(self):
         winner = self.game.get_winner()
@@ -361,8 +565,7 @@ class GameGUI:
         else:
             result = "游戏平局!"
 
-        black_score = sum(row.count(1) for row in self.game.territory)
-        white_score = sum(row.count(2) for row in self.game.territory)
+        black_score, white_score = self.game.score()
 
         messagebox.showinfo(
             "游戏结束",
@@ -370,16 +573,22 @@ class GameGUI:
         )
 
     def new_game(self):
+        self.cancel_ai_search()
+        self.stop_pondering()
+        self.ponder_label.config(text="后台思考: 等待中" if self.ponder_enabled.get() else "后台思考: 关闭")
         self.game_over = False
         self.game = GameState()
-        self.ai = MCTS_AI(simulations_per_move=self.ai_strength.get()) # 重新初始化AI以防强度改变
+        self.ai.simulations_per_move = self.ai_strength.get()
+        self.ai.reset() # 丢弃上一局保留的搜索树
 
         # 重绘棋盘
         self.draw_board()
 
-        # 如果AI是先手，则让AI先走
+        # 如果AI是先手，则让AI先走；否则玩家先走，AI在后台思考
         if not self.game_over and self.game.current_player == self.ai_player:
             self.root.after(100, self.ai_move) # AI先走
+        else:
+            self.start_pondering()
 
     def switch_sides(self):
         if self.game.turn_count > 0:
@@ -407,8 +616,7 @@ class GameGUI:
         else:
             result_text = "游戏平局!"
 
-        black_score = sum(row.count(1) for row in self.game.territory)
-        white_score = sum(row.count(2) for row in self.game.territory)
+        black_score, white_score = self.game.score()
 
         # 显示更详细的结果，包括每个玩家的领地
         result_details = f"""
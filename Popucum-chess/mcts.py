@@ -1,11 +1,172 @@
 import math
 import random
-import copy
-from typing import List, Tuple
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, List, Tuple
+
+from array_tree import ArrayTree
+from endgame import EndgameSolver, estimated_leaves
 
 
 # --- 1. 游戏引擎 (GameState Class) ---
 
+# 格子编号 idx = r * 9 + c -> 坐标元组, 避免重复构造
+_MOVES = [(r, c) for r in range(9) for c in range(9)]
+
+# 八个方向：前四个为三连方向 (横、竖、主对角线、副对角线)，后四个为其反方向
+_DIRECTIONS = [(0, 1), (1, 0), (1, 1), (1, -1), (0, -1), (-1, 0), (-1, -1), (-1, 1)]
+
+
+def _build_rays():
+    """
+    _RAYS[idx][d]: 从格子 idx 出发 (不含起点) 沿方向 d 直到边界的格子序列，
+    每个元素为 (行, 列, 位掩码)。
+    """
+    rays = []
+    for r0, c0 in _MOVES:
+        cell_rays = []
+        for dr, dc in _DIRECTIONS:
+            ray = []
+            r, c = r0 + dr, c0 + dc
+            while 0 <= r < 9 and 0 <= c < 9:
+                ray.append((r, c, 1 << (r * 9 + c)))
+                r, c = r + dr, c + dc
+            cell_rays.append(tuple(ray))
+        rays.append(tuple(cell_rays))
+    return tuple(rays)
+
+
+def _build_windows():
+    """
+    _WINDOWS[idx]: 所有包含格子 idx 的三连窗口，顺序与方向表一致。
+    每个窗口为 (r1, c1, r2, c2, r3, c3, 三子掩码, 领地序列)，
+    领地序列依次为三连本身、从窗口末端出发的正向射线、从窗口起点出发的反向射线。
+    """
+    windows = [[] for _ in range(81)]
+    for d, (dr, dc) in enumerate(_DIRECTIONS[:4]):
+        for r1, c1 in _MOVES:
+            r3, c3 = r1 + 2 * dr, c1 + 2 * dc
+            if not (0 <= r3 < 9 and 0 <= c3 < 9):
+                continue
+            r2, c2 = r1 + dr, c1 + dc
+            mask = (1 << (r1 * 9 + c1)) | (1 << (r2 * 9 + c2)) | (1 << (r3 * 9 + c3))
+            cells = ((r1, c1, 1 << (r1 * 9 + c1)), (r2, c2, 1 << (r2 * 9 + c2)), (r3, c3, 1 << (r3 * 9 + c3)))
+            rays = (cells, _RAYS[r3 * 9 + c3][d], _RAYS[r1 * 9 + c1][d + 4])
+            window = (r1, c1, r2, c2, r3, c3, mask, rays)
+            for r, c in ((r1, c1), (r2, c2), (r3, c3)):
+                windows[r * 9 + c].append(window)
+    return tuple(tuple(w) for w in windows)
+
+
+# 模块导入时一次性预计算，规则判断时只查表
+_RAYS = _build_rays()
+_WINDOWS = _build_windows()
+
+
+# 回合数超过该值的局面共用回合键 (正常对局40回合即结束)
+_MAX_HASHED_TURNS = 64
+
+
+def _build_zobrist_keys():
+    """
+    Zobrist 随机键，使用固定种子的独立生成器，不影响全局 random 的序列。
+    棋子键和领地键按 [玩家][格子编号] 索引，回合键按回合数索引。
+    """
+    rng = random.Random(0x5A0B)
+    stone = (None, tuple(rng.getrandbits(64) for _ in range(81)), tuple(rng.getrandbits(64) for _ in range(81)))
+    territory = (None, tuple(rng.getrandbits(64) for _ in range(81)), tuple(rng.getrandbits(64) for _ in range(81)))
+    turn = tuple(rng.getrandbits(64) for _ in range(_MAX_HASHED_TURNS))
+    white_to_move = rng.getrandbits(64)
+    return stone, territory, turn, white_to_move
+
+
+_ZOBRIST_STONE, _ZOBRIST_TERRITORY, _ZOBRIST_TURN, _ZOBRIST_WHITE = _build_zobrist_keys()
+
+
+def _zobrist_turn(turn_count: int, current_player: int) -> int:
+    """回合数与行棋方对应的键"""
+    key = _ZOBRIST_TURN[min(turn_count, _MAX_HASHED_TURNS - 1)]
+    return key ^ _ZOBRIST_WHITE if current_player == 2 else key
+
+
+def _zobrist_mask(keys, mask: int) -> int:
+    """掩码中所有格子的键的异或"""
+    h = 0
+    while mask:
+        low = mask & -mask
+        h ^= keys[low.bit_length() - 1]
+        mask ^= low
+    return h
+
+
+def zobrist_hash(state) -> int:
+    """
+    完整计算一个局面 (GameState 或 BitboardGameState) 的 Zobrist 哈希，
+    包含棋子、领地、行棋方和回合数。对局中由 make_move 增量维护，这里用于初始化和校验。
+    """
+    h = _zobrist_turn(state.turn_count, state.current_player)
+    board, territory = state.board, state.territory
+    for idx, (r, c) in enumerate(_MOVES):
+        if board[r][c]:
+            h ^= _ZOBRIST_STONE[board[r][c]][idx]
+        if territory[r][c]:
+            h ^= _ZOBRIST_TERRITORY[territory[r][c]][idx]
+    return h
+
+
+def _zobrist_after_move(h, idx, player, turn_count, removed, from_empty, from_opponent) -> int:
+    """由落子前的哈希和 make_move 的变化掩码得到落子后的哈希"""
+    h ^= _ZOBRIST_STONE[player][idx]
+    if removed:
+        # 被消除的棋子包含刚落下的一子，异或两次即抵消
+        h ^= _zobrist_mask(_ZOBRIST_STONE[player], removed)
+        h ^= _zobrist_mask(_ZOBRIST_TERRITORY[player], from_empty | from_opponent)
+        if from_opponent:
+            h ^= _zobrist_mask(_ZOBRIST_TERRITORY[3 - player], from_opponent)
+    return h ^ _zobrist_turn(turn_count, player) ^ _zobrist_turn(turn_count + 1, 3 - player)
+
+
+class LegalMoveSet:
+    """
+    格子编号的集合，用 数组 + 位置索引 实现 O(1) 的增加、删除和随机抽取。
+    删除时把数组末尾元素换到被删位置。
+    """
+    __slots__ = ("items", "_pos")
+
+    def __init__(self, cells=()):
+        self.items = []
+        self._pos = [-1] * 81
+        for idx in cells:
+            self.add(idx)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, idx):
+        return self._pos[idx] >= 0
+
+    def add(self, idx):
+        if self._pos[idx] < 0:
+            self._pos[idx] = len(self.items)
+            self.items.append(idx)
+
+    def discard(self, idx):
+        i = self._pos[idx]
+        if i >= 0:
+            last = self.items.pop()
+            if last != idx:
+                self.items[i] = last
+                self._pos[last] = i
+            self._pos[idx] = -1
+
+    def copy(self):
+        other = LegalMoveSet.__new__(LegalMoveSet)
+        other.items = self.items[:]
+        other._pos = self._pos[:]
+        return other
+
+
 class GameState:
     """
     管理游戏的所有状态和规则。
@@ -22,25 +183,118 @@ class GameState:
         self.current_player = 1
         # 回合数
         self.turn_count = 0
+        # 每个玩家的合法落子集合 (下标1: 黑方, 下标2: 白方)，随落子增量维护
+        self._legal = [None, LegalMoveSet(range(81)), LegalMoveSet(range(81))]
+        # 领地计数 (下标0: 无主, 1: 黑方, 2: 白方)，随领地变化增量维护
+        self._territory_count = [81, 0, 0]
+        # 局面的 Zobrist 哈希，随落子增量维护
+        self.zobrist = _zobrist_turn(0, 1)
+
+    def refresh(self):
+        """直接修改 board / territory / current_player / turn_count 之后调用，重建增量维护的数据"""
+        self._legal = [None, LegalMoveSet(), LegalMoveSet()]
+        self._sync_legal((1 << 81) - 1)
+        self._territory_count = self._recount_territory()
+        self.zobrist = zobrist_hash(self)
+
+    def _recount_territory(self):
+        """完整遍历棋盘统计领地数量"""
+        return [sum(row.count(owner) for row in self.territory) for owner in range(3)]
+
+    def same_position(self, other) -> bool:
+        """判断是否与另一个状态为同一局面 (棋子、领地、行棋方、回合数都相同)"""
+        return self.current_player == other.current_player and self.turn_count == other.turn_count \
+            and self.board == other.board and self.territory == other.territory
+
+    def check_consistency(self):
+        """调试用：用完整重算校验增量维护的计数和合法落子集合，不一致时抛出 AssertionError"""
+        recount = self._recount_territory()
+        assert self._territory_count == recount, \
+            f"领地计数 {self._territory_count} 与重算结果 {recount} 不一致"
+        for player in (1, 2):
+            expected = {r * 9 + c for r in range(9) for c in range(9)
+                        if self.board[r][c] == 0 and self.territory[r][c] in (0, player)}
+            assert set(self._legal[player].items) == expected, f"玩家{player}的合法落子集合不一致"
+        assert self.zobrist == zobrist_hash(self), "Zobrist 哈希与重算结果不一致"
+
+    def score(self) -> Tuple[int, int]:
+        """O(1) 返回当前比分 (黑方领地数, 白方领地数)"""
+        return self._territory_count[1], self._territory_count[2]
+
+    def _sync_legal(self, touched: int):
+        """
+        按格子编号从小到大，重新判断 touched 掩码中每个格子对双方是否合法。
+        固定的处理顺序保证不同的状态实现得到相同的集合顺序。
+        """
+        black, white = self._legal[1], self._legal[2]
+        while touched:
+            low = touched & -touched
+            touched ^= low
+            idx = low.bit_length() - 1
+            r, c = _MOVES[idx]
+            if self.board[r][c] != 0:
+                black.discard(idx)
+                white.discard(idx)
+                continue
+            owner = self.territory[r][c]
+            if owner == 2:
+                black.discard(idx)
+            else:
+                black.add(idx)
+            if owner == 1:
+                white.discard(idx)
+            else:
+                white.add(idx)
 
     def clone(self):
-        """深度克隆当前游戏状态，用于MCTS模拟"""
+        """克隆当前游戏状态 (MCTS搜索开始时调用一次，搜索过程中使用 make_move / unmake_move)"""
         state = GameState()
-        state.board = copy.deepcopy(self.board)
-        state.territory = copy.deepcopy(self.territory)
+        state.board = [row[:] for row in self.board]
+        state.territory = [row[:] for row in self.territory]
         state.current_player = self.current_player
         state.turn_count = self.turn_count
+        state._legal = [None, self._legal[1].copy(), self._legal[2].copy()]
+        state._territory_count = self._territory_count[:]
+        state.zobrist = self.zobrist
         return state
 
     def get_legal_moves(self) -> List[Tuple[int, int]]:
-        """获取所有合法落子点"""
-        moves = []
-        for r in range(9):
-            for c in range(9):
-                if self.board[r][c] == 0 and \
-                        (self.territory[r][c] == 0 or self.territory[r][c] == self.current_player):
-                    moves.append((r, c))
-        return moves
+        """获取所有合法落子点 (按行优先顺序)"""
+        return [_MOVES[idx] for idx in sorted(self._legal[self.current_player].items)]
+
+    def random_legal_move(self):
+        """O(1) 随机返回一个合法落子点，无处可下时返回 None"""
+        items = self._legal[self.current_player].items
+        if not items:
+            return None
+        return _MOVES[random.choice(items)]
+
+    @staticmethod
+    def move_index(undo) -> int:
+        """make_move 返回的撤销记录中落子的格子编号"""
+        return undo[0]
+
+    def three_completion(self, idx: int, owner: int) -> int:
+        """
+        在包含格子 idx 的三连窗口中 (与 _check_for_threes 查同一张表)，找 owner 已占两格、
+        剩下一格为空且当前玩家可以落子的窗口，返回这一格的编号，没有时返回 -1。
+        """
+        board, territory = self.board, self.territory
+        opponent = 3 - self.current_player
+        for r1, c1, r2, c2, r3, c3, _, _ in _WINDOWS[idx]:
+            s1, s2, s3 = board[r1][c1], board[r2][c2], board[r3][c3]
+            if s1 == 0 and s2 == owner and s3 == owner:
+                r, c = r1, c1
+            elif s2 == 0 and s1 == owner and s3 == owner:
+                r, c = r2, c2
+            elif s3 == 0 and s1 == owner and s2 == owner:
+                r, c = r3, c3
+            else:
+                continue
+            # 对方领地上不能落子
+            if territory[r][c] != opponent:
+                return r * 9 + c
+        return -1
 
     def is_terminal(self) -> bool:
         """判断游戏是否结束"""
@@ -51,8 +305,7 @@ class GameState:
         if not self.is_terminal():
             return -1  # 游戏未结束
 
-        black_score = sum(row.count(1) for row in self.territory)
-        white_score = sum(row.count(2) for row in self.territory)
+        black_score, white_score = self.score()
 
         if black_score > white_score:
             return 1
@@ -61,99 +314,129 @@ class GameState:
         else:
             return 0
 
+    def pass_turn(self):
+        """当前玩家无棋可下时跳过回合"""
+        self.zobrist ^= _zobrist_turn(self.turn_count, self.current_player)
+        self.turn_count += 1
+        self.current_player = 3 - self.current_player
+        self.zobrist ^= _zobrist_turn(self.turn_count, self.current_player)
+
     def make_move(self, move: Tuple[int, int]):
         """
         执行一步棋，并更新棋盘状态。这是最核心的逻辑。
+        规则判断只查预计算表 (_WINDOWS / _RAYS)，除撤销记录外不分配任何元组或列表。
+        返回撤销记录 (落子格编号, 落子玩家, 落子前回合数, 被消除的棋子掩码,
+        由无主变为己方的领地掩码, 由对方变为己方的领地掩码, 落子前的哈希)，交给 unmake_move 即可恢复；
+        非法移动不改变状态，返回 None。
         """
         r, c = move
         if not (0 <= r < 9 and 0 <= c < 9 and self.board[r][c] == 0):
             # 非法移动，理论上不应发生
-            return
+            return None
 
-        self.board[r][c] = self.current_player
+        board = self.board
+        territory = self.territory
+        player = self.current_player
+        opponent = 3 - player
+        idx = r * 9 + c
+        board[r][c] = player
 
-        # 检查是否形成三连
-        threes_found = self._check_for_threes(move)
+        # 检查是否形成三连，得到所有将被消除的棋子
+        removed = self._check_for_threes(idx)
+        from_empty = 0
+        from_opponent = 0
 
-        if threes_found:
-            # 首先，识别所有将被移除并转化为领地的棋子
-            all_pieces_to_convert_to_territory = set()
-            for line_pieces, _ in threes_found:
-                for piece_pos in line_pieces:
-                    all_pieces_to_convert_to_territory.add(piece_pos)
+        if removed:
+            for r1, c1, r2, c2, r3, c3, mask, rays in _WINDOWS[idx]:
+                # 完全落在消除范围内的窗口一定是本次形成的三连
+                if removed & mask != mask:
+                    continue
 
-            # 1. 将这些棋子从棋盘上移除，并将其位置标记为当前玩家的领地
-            for pr, pc in all_pieces_to_convert_to_territory:
-                self.board[pr][pc] = 0
-                self.territory[pr][pc] = self.current_player
+                # 1. 将三连的棋子从棋盘上移除，并将其位置标记为当前玩家的领地
+                board[r1][c1] = board[r2][c2] = board[r3][c3] = 0
 
-            # 2. 为每一个形成的三连分别进行领地扩散
-            #    确保扩散仅基于构成该特定三连的棋子
-            for line_pieces, line_direction in threes_found:
-                self._diffuse_territory(line_pieces, line_direction)
+                # 2. 三连本身变为领地，再从两端沿同一直线向外扩散，
+                #    直到边界或对方棋子
+                for ray in rays:
+                    for rr, rc, bit in ray:
+                        if board[rr][rc] == opponent:
+                            break
+                        owner = territory[rr][rc]
+                        if owner != player:
+                            territory[rr][rc] = player
+                            if owner:
+                                from_opponent |= bit
+                            else:
+                                from_empty |= bit
 
-        # 更新回合和玩家
-        self.turn_count += 1
-        self.current_player = 3 - self.current_player  # 1 -> 2, 2 -> 1
+            counts = self._territory_count
+            counts[0] -= from_empty.bit_count()
+            counts[opponent] -= from_opponent.bit_count()
+            counts[player] += (from_empty | from_opponent).bit_count()
 
-    def _check_for_threes(self, move: Tuple[int, int]) -> List[Tuple[List[Tuple[int, int]], Tuple[int, int]]]:
-        """
-        以新落的子为中心，检查所有方向是否形成三连。
-        返回一个列表，每个元素是 ([三个棋子的坐标], 方向向量)
-        """
-        r, c = move
-        player = self.current_player
-        threes = []
-
-        # 定义四个方向：横、竖、主对角线、副对角线
-        directions = [(0, 1), (1, 0), (1, 1), (1, -1)]
+        undo = (idx, player, self.turn_count, removed, from_empty, from_opponent, self.zobrist)
+        self._sync_legal((1 << idx) | removed | from_empty | from_opponent)
+        self.zobrist = _zobrist_after_move(self.zobrist, idx, player, self.turn_count,
+                                           removed, from_empty, from_opponent)
 
-        for dr, dc in directions:
-            # 在每个方向上，检查以新子为中心的三个可能的三连组合
-            for i in range(-2, 1):
-                p1 = (r + i * dr, c + i * dc)
-                p2 = (r + (i + 1) * dr, c + (i + 1) * dc)
-                p3 = (r + (i + 2) * dr, c + (i + 2) * dc)
-
-                line = [p1, p2, p3]
-                if all(0 <= pr < 9 and 0 <= pc < 9 and self.board[pr][pc] == player for pr, pc in line):
-                    threes.append((line, (dr, dc)))
+        # 更新回合和玩家
+        self.turn_count += 1
+        self.current_player = opponent  # 1 -> 2, 2 -> 1
+        return undo
 
-        return threes
+    def unmake_move(self, undo):
+        """根据 make_move 返回的撤销记录恢复到落子前的状态"""
+        if undo is None:
+            return
+        idx, player, turn_count, removed, from_empty, from_opponent, zobrist = undo
+        board = self.board
+        territory = self.territory
+        opponent = 3 - player
 
-    def _diffuse_territory(self, start_pieces: List[Tuple[int, int]], direction: Tuple[int, int]):
-        """
-        从一条线段的两端向外扩散领地，确保只在同一直线上扩散
-        """
-        dr, dc = direction
+        m = from_empty
+        while m:
+            low = m & -m
+            r, c = _MOVES[low.bit_length() - 1]
+            territory[r][c] = 0
+            m ^= low
+        m = from_opponent
+        while m:
+            low = m & -m
+            r, c = _MOVES[low.bit_length() - 1]
+            territory[r][c] = opponent
+            m ^= low
+        m = removed
+        while m:
+            low = m & -m
+            r, c = _MOVES[low.bit_length() - 1]
+            board[r][c] = player
+            m ^= low
+        r, c = _MOVES[idx]
+        board[r][c] = 0
 
-        # 向正方向扩散
-        pos_r, pos_c = max(start_pieces, key=lambda p: p[0] * dr + p[1] * dc)
-        self._diffuse_in_one_direction(pos_r, pos_c, dr, dc)
+        if from_empty or from_opponent:
+            counts = self._territory_count
+            counts[0] += from_empty.bit_count()
+            counts[opponent] += from_opponent.bit_count()
+            counts[player] -= (from_empty | from_opponent).bit_count()
 
-        # 向反方向扩散
-        neg_r, neg_c = min(start_pieces, key=lambda p: p[0] * dr + p[1] * dc)
-        self._diffuse_in_one_direction(neg_r, neg_c, -dr, -dc)
+        self.turn_count = turn_count
+        self.current_player = player
+        self.zobrist = zobrist
+        self._sync_legal((1 << idx) | removed | from_empty | from_opponent)
 
-    def _diffuse_in_one_direction(self, r_start, c_start, dr, dc):
+    def _check_for_threes(self, idx: int) -> int:
         """
-        从起始点沿着指定方向扩散领地，确保只在直线上扩散
+        检查包含新落子 idx 的所有三连窗口 (横、竖、主对角线、副对角线)。
+        返回所有三连棋子的并集掩码，没有三连时返回 0。
         """
-        r, c = r_start + dr, c_start + dc
-
-        # 检查是否为斜线方向
-        is_diagonal = abs(dr) == 1 and abs(dc) == 1
-
-        while 0 <= r < 9 and 0 <= c < 9:
-            # 遇到对方棋子，停止扩散
-            if self.board[r][c] == 3 - self.current_player:
-                break
-
-            # 转化空格或对方领地
-            self.territory[r][c] = self.current_player
-
-            # 更新坐标，继续沿着同一方向扩散
-            r, c = r + dr, c + dc
+        board = self.board
+        player = self.current_player
+        removed = 0
+        for r1, c1, r2, c2, r3, c3, mask, _ in _WINDOWS[idx]:
+            if board[r1][c1] == player and board[r2][c2] == player and board[r3][c3] == player:
+                removed |= mask
+        return removed
 
     def display(self):
         """打印棋盘，方便调试"""
@@ -181,87 +464,942 @@ class GameState:
 # --- 2. MCTS 节点 (MCTSNode Class) ---
 
 class MCTSNode:
-    def __init__(self, state: GameState, parent=None, move=None):
-        self.state = state
-        self.parent = parent
-        self.move = move
-        self.children = []
+    """
+    搜索图中的一个局面。走法记在边上 (child_moves 与 children 一一对应)，
+    启用置换表时同一局面只有一个节点，可以同时是多个父节点的子节点，
+    因此反向传播沿本次模拟实际经过的路径进行，而不依赖父节点指针。
+    节点按需初始化：合法落子列表在第一次需要从它扩展时才生成，子节点列表在第一次扩展时才分配，
+    只被模拟过一次的叶子只占一个很小的对象。
+    """
+    __slots__ = ("key", "player", "children", "child_moves", "wins", "visits", "untried_moves")
+
+    def __init__(self, state: GameState):
+        # 局面的 Zobrist 哈希，作为置换表的键
+        self.key = state.zobrist
+        # 走出这一步的玩家 (state.current_player 已经是 *下一个* 玩家)
+        self.player = 3 - state.current_player
+        self.children = ()
+        self.child_moves = ()
         self.wins = 0
         self.visits = 0
-        self.untried_moves = self.state.get_legal_moves()
+        # None 表示还没有生成合法落子列表
+        self.untried_moves = None
+
+    def prepare(self, state: GameState, prune=None):
+        """
+        state 为本节点的局面，第一次经过时生成合法落子列表。
+        prune(state, moves) 可以去掉不必展开的走法 (例如互相对称的走法只保留一个)。
+        """
+        if self.untried_moves is None:
+            moves = state.get_legal_moves()
+            self.untried_moves = prune(state, moves) if prune is not None else moves
 
     def select_child(self, exploration_constant):
-        """使用UCT公式选择最佳子节点"""
-        return max(
-            self.children,
-            key=lambda c: (c.wins / c.visits) + exploration_constant * math.sqrt(math.log(self.visits) / c.visits)
-        )
-
-    def expand(self):
-        """从未尝试的移动中扩展一个新节点"""
+        """
+        使用UCT公式选择最佳子节点，返回 (走法, 子节点)。
+        父节点的对数项只算一次；访问次数为0的子节点直接优先选择，不会出现除以0。
+        """
+        log_visits = math.log(self.visits)
+        best = None
+        best_score = -1.0
+        for move, child in zip(self.child_moves, self.children):
+            visits = child.visits
+            if visits == 0:
+                return move, child
+            score = (child.wins / visits) + exploration_constant * math.sqrt(log_visits / visits)
+            if score > best_score:
+                best_score = score
+                best = (move, child)
+        return best
+
+    def expand(self, state: GameState, table=None):
+        """
+        从未尝试的移动中扩展一个新节点。
+        state 必须是当前节点对应的局面，会在其上就地落子，返回 (走法, 子节点, 撤销记录, 是否新建了节点)。
+        给出置换表时，落子后的局面如果已有节点则直接连接到该节点。
+        """
         move = self.untried_moves.pop()
-        new_state = self.state.clone()
-        new_state.make_move(move)
-        child_node = MCTSNode(new_state, parent=self, move=move)
+        undo = state.make_move(move)
+        if not self.children:
+            self.children, self.child_moves = [], []
+        child_node = table.get(state.zobrist) if table is not None else None
+        created = child_node is None
+        if created:
+            child_node = MCTSNode(state)
+            if table is not None:
+                table.put(state.zobrist, child_node)
         self.children.append(child_node)
-        return child_node
+        self.child_moves.append(move)
+        return move, child_node, undo, created
+
+
+class TranspositionTable:
+    """
+    置换表：Zobrist 哈希 -> 搜索节点，不同走法顺序到达的同一局面共享一个节点及其统计。
+    容量有限，满了之后淘汰最久未被命中的条目 (LRU)；被淘汰的节点仍留在搜索图中，
+    只是之后新扩展的路径不会再连接到它。
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        # 哈希 -> 节点，按最近使用排序
+        self._entries = OrderedDict()
+        self.hits = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: int):
+        node = self._entries.get(key)
+        if node is None:
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return node
+
+    def put(self, key: int, node: MCTSNode):
+        self._entries[key] = node
+        if len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+
+    def retain(self, reachable: set):
+        """
+        树根前进之后，只保留节点在 reachable (节点 id 的集合) 中的条目。
+        其余节点不再被置换表引用，随之回收，之后的命中也不会把它们重新接回搜索图。
+        """
+        stale = [key for key, node in self._entries.items() if id(node) not in reachable]
+        for key in stale:
+            del self._entries[key]
+
+    def clear(self):
+        self._entries.clear()
+        self.hits = 0
+
+
+class NodeTree:
+    """
+    由 MCTSNode 对象组成的搜索树 (启用置换表时为有向无环图)。
+    MCTS_AI 只通过下面几个方法访问搜索树，array_tree.ArrayTree 提供相同的接口。
+    """
+
+    def __init__(self, state: GameState, exploration_constant=1.414, table=None, prune=None):
+        self.C = exploration_constant
+        self.table = table
+        # 生成合法落子列表后的筛选函数，见 MCTSNode.prepare
+        self.prune = prune
+        # 可以到达的节点数，扩展时累加；树根前进后为 None，下次需要时重新统计
+        self._size = 1
+        self.root = MCTSNode(state=state)
+        if table is not None:
+            table.clear()
+            table.put(state.zobrist, self.root)
+
+    def select_and_expand(self, state: GameState, undo_stack: list, path: list, moves=None, marks=None):
+        """
+        从根节点向下选择并扩展一个节点，state 随之推进，撤销记录压入 undo_stack。
+        经过的节点依次追加到 path (包含根节点和叶子)，给出 moves 时同时记录走法。
+        给出 marks 时，选择阶段结束 (开始扩展) 的时刻追加到 marks，供 SearchStats 计时。
+        """
+        node = self.root
+        path.append(node)
+        node.prepare(state, self.prune)
+
+        # 1. 选择 (Selection)
+        while not node.untried_moves and node.children:
+            move, node = node.select_child(self.C)
+            undo_stack.append(state.make_move(move))
+            path.append(node)
+            if moves is not None:
+                moves.append(move)
+            node.prepare(state, self.prune)
+
+        if marks is not None:
+            marks.append(time.perf_counter())
+
+        # 2. 扩展 (Expansion)
+        if node.untried_moves:
+            move, node, undo, created = node.expand(state, self.table)
+            if created and self._size is not None:
+                self._size += 1
+            undo_stack.append(undo)
+            path.append(node)
+            if moves is not None:
+                moves.append(move)
+
+    @staticmethod
+    def update(path: list, visits: int, winner):
+        """path 上每个节点访问次数加 visits，走出该节点的玩家获胜时胜利次数加1"""
+        for node in path:
+            node.visits += visits
+            if node.player == winner:
+                node.wins += 1
+
+    def root_stats(self):
+        """根节点各子节点的 [(走法, 访问次数, 胜利次数)]，尚未尝试的走法统计为0"""
+        stats = [(move, child.visits, child.wins) for move, child in zip(self.root.child_moves, self.root.children)]
+        stats.extend((move, 0, 0) for move in self.root.untried_moves or ())
+        return stats
+
+    def node_count(self) -> int:
+        """从树根可以到达的节点数。扩展时增量维护，树根前进后第一次调用时遍历一次子树"""
+        if self._size is None:
+            self._size = len(self._reachable())
+        return self._size
+
+    def _reachable(self) -> set:
+        """从树根可以到达的所有节点的 id"""
+        seen = {id(self.root)}
+        stack = [self.root]
+        while stack:
+            for child in stack.pop().children:
+                if id(child) not in seen:
+                    seen.add(id(child))
+                    stack.append(child)
+        return seen
+
+    def advance(self, move, state: GameState) -> bool:
+        """
+        把走法 move 对应的子节点提升为树根 (state 已经推进到它的局面)，
+        树的其余部分不再被引用，随之被回收。没有这个子节点时返回 False。
+        """
+        for child_move, child in zip(self.root.child_moves, self.root.children):
+            if child_move == move:
+                break
+        else:
+            return False
+        self.root = child
+        self._size = None
+        if self.table is not None:
+            # 置换表中其余子树的条目一并释放，节点数顺便得到
+            reachable = self._reachable()
+            self.table.retain(reachable)
+            self._size = len(reachable)
+        return True
 
 
 # --- 3. MCTS AI (MCTS_AI Class) ---
 
+# 树并行模式下，未启用批量模拟时每个进程每次领取的叶子数
+TREE_LEAVES_PER_WORKER = 16
+
+# 计时模式下终局求解最多使用的思考时间比例，超时后放弃求解，剩下的时间用于 MCTS 搜索
+ENDGAME_TIME_SHARE = 0.5
+
+
+def _random_rollout(state: GameState, undo_stack: list) -> int:
+    """3. 模拟 (Simulation)：随机走到终局并返回胜者，撤销记录压入 undo_stack"""
+    while not state.is_terminal():
+        move = state.random_legal_move()
+        if move is None: break
+        undo_stack.append(state.make_move(move))
+    return state.get_winner()
+
+
+class HeuristicRollout:
+    """
+    带简单战术的模拟策略：以 1 - epsilon 的概率优先补成己方三连，其次堵住对方的二连，
+    否则 (以及以 epsilon 的概率) 随机落子。
+    只检查最近两步落子所在的三连窗口 (state.three_completion)，
+    新出现的二连只可能在这里，每步的额外开销是常数。
+    只通过 move_index / three_completion 访问局面，GameState 和 BitboardGameState 都可以使用。
+    """
+
+    def __init__(self, epsilon=0.1):
+        self.epsilon = epsilon
+
+    def __call__(self, state: GameState, undo_stack: list) -> int:
+        """3. 模拟 (Simulation)：走到终局并返回胜者，撤销记录压入 undo_stack"""
+        # previous 为当前玩家自己的上一步，last 为对方刚下的一步 (从搜索树中走到叶子的路径也算在内)
+        last = state.move_index(undo_stack[-1]) if undo_stack else -1
+        previous = state.move_index(undo_stack[-2]) if len(undo_stack) > 1 else -1
+        epsilon = self.epsilon
+        while not state.is_terminal():
+            move = None
+            if random.random() >= epsilon:
+                move = self._tactical_move(state, previous, last)
+            if move is None:
+                move = state.random_legal_move()
+                if move is None: break
+            undo_stack.append(state.make_move(move))
+            previous, last = last, move[0] * 9 + move[1]
+        return state.get_winner()
+
+    @staticmethod
+    def _tactical_move(state: GameState, previous: int, last: int):
+        """在 previous 周围找能补成己方三连的空位，再在 last 周围找对方二连的空位，都没有时返回 None"""
+        player = state.current_player
+        for idx, owner in ((previous, player), (last, 3 - player)):
+            if idx >= 0:
+                cell = state.three_completion(idx, owner)
+                if cell >= 0:
+                    return _MOVES[cell]
+        return None
+
+
+# 内置的模拟策略，MCTS_AI(rollout=...) 按名字选择，
+# 也可以直接传入签名相同的函数 (state, undo_stack) -> 胜者
+ROLLOUT_POLICIES = {
+    "random": _random_rollout,
+    "heuristic": HeuristicRollout(),
+}
+
+
+def _root_search_worker(state, exploration_constant, simulations, batch_size, transposition_size,
+                        think_time_ms, symmetry_turns, rollout, seed):
+    """进程池中执行的一次独立搜索，返回根节点各子节点的统计 (simulations 为 None 表示只受时间限制)"""
+    random.seed(seed)
+    ai = MCTS_AI(exploration_constant, batch_size=batch_size, transposition_size=transposition_size,
+                 think_time_ms=think_time_ms, max_simulations=simulations, symmetry_turns=symmetry_turns,
+                 rollout=rollout)
+    return ai.root_statistics(state, simulations)
+
+
+def _rollout_paths_worker(root_state, paths, batch_size, rollout, seed):
+    """
+    进程池中执行的一批模拟：从根局面依次重放每条走法路径到叶子，
+    再按模拟策略 rollout 走到终局，按顺序返回胜者列表。
+    """
+    random.seed(seed)
+    state = root_state
+    undo_stack = []
+
+    if batch_size > 1:
+        try:
+            import batch_rollout
+        except ImportError:
+            batch_rollout = None
+        if batch_rollout is not None:
+            batch = batch_rollout.new_batch(len(paths))
+            for i, path in enumerate(paths):
+                for move in path:
+                    undo_stack.append(state.make_move(move))
+                batch_rollout.store_state(batch, i, state)
+                while undo_stack:
+                    state.unmake_move(undo_stack.pop())
+            rng = batch_rollout.np.random.default_rng(seed)
+            return batch_rollout.play_out(*batch, rng=rng).tolist()
+
+    winners = []
+    for path in paths:
+        for move in path:
+            undo_stack.append(state.make_move(move))
+        winners.append(rollout(state, undo_stack))
+        while undo_stack:
+            state.unmake_move(undo_stack.pop())
+    return winners
+
+
+class SearchBudget:
+    """
+    一次搜索的预算：模拟次数上限、截止时间和停止信号 stop (threading.Event)，至少给出一个。
+    搜索循环每次用 take() 申请模拟次数，返回0时停止；done 可以在其他线程中读取，用于显示进度。
+    early_stop 为 True 时，每隔 CHECK_INTERVAL 次模拟检查一次：
+    如果访问次数最多的根子节点领先第二名的幅度已经超过剩余预算 (按当前速度估计) 能带来的访问次数，
+    最终选择的走法不会再改变，提前结束。
+    on_progress 不为 None 时，每隔 progress_interval 次模拟调用一次 on_progress(已完成次数, 根子节点统计)，
+    统计格式与 root_stats() 相同。回调在搜索线程中执行。
+    """
+    CHECK_INTERVAL = 32
+    PROGRESS_INTERVAL = 200
+
+    def __init__(self, simulations=None, think_time_ms=None, early_stop=True, stop=None,
+                 on_progress=None, progress_interval=PROGRESS_INTERVAL):
+        self.simulations = simulations
+        self.stop = stop
+        self.on_progress = on_progress
+        self.progress_interval = progress_interval
+        self._next_progress = progress_interval
+        self.start = time.perf_counter()
+        self.deadline = None if think_time_ms is None else self.start + think_time_ms / 1000
+        self.early_stop = early_stop
+        self.done = 0
+        self.stopped_early = False
+        self._next_check = self.CHECK_INTERVAL
+
+    def take(self, tree, count: int = 1) -> int:
+        """申请最多 count 次模拟，返回实际批准的次数，0 表示预算已经用完"""
+        if self.simulations is not None:
+            count = min(count, self.simulations - self.done)
+        if count <= 0:
+            return 0
+        if self.deadline is not None and time.perf_counter() >= self.deadline:
+            return 0
+        if self.stop is not None and self.stop.is_set():
+            return 0
+        if self.early_stop and self.done >= self._next_check:
+            self._next_check = self.done + self.CHECK_INTERVAL
+            if self._decided(tree):
+                self.stopped_early = True
+                return 0
+        if self.on_progress is not None and self.done >= self._next_progress:
+            self._next_progress = self.done + self.progress_interval
+            self.on_progress(self.done, tree.root_stats())
+        self.done += count
+        return count
+
+    def remaining(self) -> float:
+        """剩余预算还能进行的模拟次数 (计时模式下按目前的平均速度估计)"""
+        remaining = math.inf
+        if self.simulations is not None:
+            remaining = self.simulations - self.done
+        if self.deadline is not None:
+            now = time.perf_counter()
+            rate = self.done / max(now - self.start, 1e-9)
+            remaining = min(remaining, (self.deadline - now) * rate)
+        return remaining
+
+    def _decided(self, tree) -> bool:
+        """剩余的模拟全部给第二名也追不上第一名时返回 True"""
+        stats = tree.root_stats()
+        if len(stats) == 1:
+            # 只有一个合法走法
+            return True
+        best = second = 0
+        for _, visits, _ in stats:
+            if visits > best:
+                best, second = visits, best
+            elif visits > second:
+                second = visits
+        return best - second > self.remaining()
+
+
+class SearchStats:
+    """
+    一次搜索的统计，MCTS_AI(collect_stats=True) 时记录，搜索结束后见 MCTS_AI.last_stats。
+    各阶段为累计耗时 (秒)：选择 (selection) 从根走到待扩展的节点，扩展 (expansion) 新建子节点并落子，
+    反向传播 (backprop) 更新路径上的统计 (含虚拟失败的施加与撤销)，
+    模拟 (rollout) 为其余时间，即走到终局、回退局面，批量和树并行时还包括等待这一批结果。
+    tree_size 和 root_children 在 refresh() 时从搜索树读取。
+    """
+
+    def __init__(self):
+        self.simulations = 0
+        self.seconds = 0.0
+        self.selection = 0.0
+        self.expansion = 0.0
+        self.backprop = 0.0
+        # 叶子相对搜索树根的最大深度
+        self.max_depth = 0
+        self.tree_size = 0
+        # [(走法, 访问次数, 胜率)]，按访问次数从多到少
+        self.root_children = []
+
+    @property
+    def rollout(self) -> float:
+        return max(self.seconds - self.selection - self.expansion - self.backprop, 0.0)
+
+    @property
+    def simulations_per_second(self) -> float:
+        return self.simulations / self.seconds if self.seconds > 0 else 0.0
+
+    def refresh(self, tree, seconds: float):
+        """记录到目前为止的总耗时，并从搜索树读取节点数和根子节点统计"""
+        self.seconds = seconds
+        self.tree_size = tree.node_count()
+        stats = sorted(tree.root_stats(), key=lambda s: s[1], reverse=True)
+        self.root_children = [(move, visits, wins / visits if visits else 0.0) for move, visits, wins in stats]
+
+    def as_dict(self) -> dict:
+        """可以写成 JSON 的字典"""
+        return {
+            "simulations": self.simulations,
+            "seconds": self.seconds,
+            "simulations_per_second": self.simulations_per_second,
+            "phases": {"selection": self.selection, "expansion": self.expansion,
+                       "rollout": self.rollout, "backprop": self.backprop},
+            "tree_size": self.tree_size,
+            "max_depth": self.max_depth,
+            "root_children": [{"move": list(move), "visits": visits, "win_rate": win_rate}
+                              for move, visits, win_rate in self.root_children],
+        }
+
+    def summary(self) -> str:
+        """几行文字的摘要，用于界面显示"""
+        total = max(self.seconds, 1e-9)
+        return (f"{self.simulations} 次模拟, {self.simulations_per_second:.0f} 次/秒\n"
+                f"选择 {self.selection / total:.0%} 扩展 {self.expansion / total:.0%} "
+                f"模拟 {self.rollout / total:.0%} 反向传播 {self.backprop / total:.0%}\n"
+                f"节点 {self.tree_size}, 最大深度 {self.max_depth}")
+
+
+class _TimedTree:
+    """
+    包装一棵搜索树，把各阶段的耗时记入 SearchStats，其余调用原样转发。
+    只在启用统计时使用，搜索循环本身不需要任何改动，关闭统计时没有额外开销。
+    每完成 interval 次模拟 (带胜者的反向传播) 调用一次 on_stats(stats)。
+    """
+
+    def __init__(self, tree, stats: SearchStats, on_stats=None, interval=1000):
+        self.tree = tree
+        self.stats = stats
+        self.on_stats = on_stats
+        self.interval = interval
+        self._next_report = interval
+        self.start = time.perf_counter()
+
+    def select_and_expand(self, state: GameState, undo_stack: list, path: list, moves=None):
+        start = time.perf_counter()
+        first = len(path)
+        marks = []
+        self.tree.select_and_expand(state, undo_stack, path, moves, marks)
+        end = time.perf_counter()
+        stats = self.stats
+        mark = marks[0] if marks else end
+        stats.selection += mark - start
+        stats.expansion += end - mark
+        depth = len(path) - first - 1
+        if depth > stats.max_depth:
+            stats.max_depth = depth
+
+    def update(self, path: list, visits: int, winner):
+        start = time.perf_counter()
+        self.tree.update(path, visits, winner)
+        stats = self.stats
+        stats.backprop += time.perf_counter() - start
+        if winner is not None:
+            stats.simulations += 1
+            if self.on_stats is not None and stats.simulations >= self._next_report:
+                self._next_report = stats.simulations + self.interval
+                self.finish()
+                self.on_stats(stats)
+
+    def root_stats(self):
+        return self.tree.root_stats()
+
+    def finish(self):
+        """
+        把总耗时和搜索树的当前状态写入统计。读取搜索树本身花费的时间不属于搜索，
+        从计时起点中扣除，不会被算进由剩余时间推出的模拟阶段。
+        """
+        start = time.perf_counter()
+        self.stats.refresh(self.tree, start - self.start)
+        self.start += time.perf_counter() - start
+
+
 class MCTS_AI:
-    def __init__(self, exploration_constant=1.414, simulations_per_move=1000):
+    def __init__(self, exploration_constant=1.414, simulations_per_move=1000, batch_size=1, workers=1,
+                 parallel="root", virtual_loss=1, reuse_tree=True, transposition_size=0,
+                 think_time_ms=None, max_simulations=None, tree="node", opening_book=None, symmetry_turns=6,
+                 rollout="random", endgame_leaves=10_000_000, collect_stats=False, stats_interval=1000,
+                 engine="list"):
+        """
+        batch_size > 1 时启用 NumPy 批量模拟：每轮先选出 batch_size 个叶子节点，
+        再用 batch_rollout 一次性完成它们的随机对局 (需要安装 numpy)。
+        workers > 1 时启用多进程并行，parallel 选择并行方式：
+          "root": 根并行。simulations_per_move 平均分给多个进程，
+                  各自以不同的种子从同一根节点独立搜索，合并根子节点的统计后选择走法。
+          "tree": 树并行。主进程维护一棵共享的搜索树，把选出的叶子成批分给各进程模拟；
+                  叶子在模拟期间对其路径施加 virtual_loss 次虚拟失败，使后续选择分散到其他分支。
+        进程池在第一次搜索时创建并在之后的每一步复用，用完后调用 close() 释放。
+        reuse_tree 为 True 时，AI 在一局之内保留搜索树：走完一步后树根移到所选子节点，
+        对手应着后再移到对应的孙节点，已有的访问统计继续使用 (根并行除外)。
+        新开一局时调用 reset()。
+        transposition_size > 0 时启用置换表 (最多记录这么多个局面)：不同走法顺序到达的同一局面
+        (按 Zobrist 哈希判断) 共用一个节点，统计合并，也不再重复展开相同的子树。
+        think_time_ms 不为 None 时按时间搜索：每步最多思考这么多毫秒，simulations_per_move 不再使用，
+        max_simulations 为可选的模拟次数上限。按时间搜索时，一旦访问次数最多的根子节点在剩余时间内
+        不可能被超过，就提前结束搜索；固定次数模式总是完成 simulations_per_move 次模拟。
+        tree 选择搜索树的存储方式："node" 为 MCTSNode 对象；"array" 为 array_tree.ArrayTree，
+        统计保存在数组列中，子节点在扩展时才分配一行，每个节点20字节 (不支持置换表)。
+        opening_book 为开局库文件路径 (由 opening_book.py 生成) 或已打开的 OpeningBook，
+        开局阶段命中库内局面 (含对称局面) 时直接返回库内走法，不再搜索。
+        symmetry_turns > 0 时，回合数小于它的局面如果保持某些对称 (例如空棋盘、天元落子之后)，
+        互相对称的走法只展开一个，模拟集中在不等价的走法上；选出的走法就是该组的代表，
+        本身是一个合法走法。为0时不做对称剪枝。
+        rollout 为模拟策略：ROLLOUT_POLICIES 中的名字 ("random" 随机落子，"heuristic" 优先补三连、堵二连，
+        见 HeuristicRollout)，或签名为 (state, undo_stack) -> 胜者 的函数 (树并行时需要能被 pickle)。
+        批量模拟由 NumPy 引擎随机落子，只能与 "random" 一起使用。
+        engine 为搜索使用的局面引擎："list" 直接复制调用方传入的局面 (GameState)；
+        "bitboard" 在搜索开始时把局面转换为 bitboard.BitboardGameState，模拟更快，调用方仍然传入 GameState。
+        endgame_leaves > 0 时，一旦剩余手数和合法落子数估计出的终局局面数 (endgame.estimated_leaves)
+        不超过它，改用 endgame.EndgameSolver 精确求解，直接返回按胜负最优的走法。为0时始终搜索。
+        collect_stats 为 True 时记录每次搜索的 SearchStats (各阶段耗时、每秒模拟次数、节点数、最大深度、
+        根子节点统计)，保存在 last_stats 中；find_best_move 的 on_stats 回调每 stats_interval 次模拟调用一次。
+        关闭时搜索循环不做任何额外的计时。
+        """
+        if virtual_loss < 1:
+            raise ValueError("virtual_loss 至少为1")
+        if parallel not in ("root", "tree"):
+            raise ValueError(f"未知的并行方式: {parallel}")
+        if tree not in ("node", "array"):
+            raise ValueError(f"未知的搜索树类型: {tree}")
+        if tree == "array" and transposition_size > 0:
+            raise ValueError("数组搜索树不支持置换表")
+        if isinstance(rollout, str) and rollout not in ROLLOUT_POLICIES:
+            raise ValueError(f"未知的模拟策略: {rollout}")
+        if batch_size > 1 and rollout != "random":
+            raise ValueError("批量模拟只支持随机模拟策略")
+        if engine not in ("list", "bitboard"):
+            raise ValueError(f"未知的局面引擎: {engine}")
         self.C = exploration_constant
         self.simulations_per_move = simulations_per_move
+        self.think_time_ms = think_time_ms
+        self.max_simulations = max_simulations
+        self.batch_size = batch_size
+        self.workers = workers
+        self.parallel = parallel
+        self.virtual_loss = virtual_loss
+        self.reuse_tree = reuse_tree
+        self.tree = tree
+        self._tree = None
+        self._root_state = None
+        self._table = TranspositionTable(transposition_size) if transposition_size > 0 else None
+        self._pool = None
+        self._batch_rollout = None
+        if batch_size > 1:
+            try:
+                import batch_rollout
+                self._batch_rollout = batch_rollout
+            except ImportError:
+                print("警告：未安装 numpy，无法使用批量模拟，改为逐局模拟。运行 'pip install numpy' 来安装。")
+                self.batch_size = 1
+        self.symmetry_turns = symmetry_turns
+        self.rollout = rollout
+        self._rollout = ROLLOUT_POLICIES[rollout] if isinstance(rollout, str) else rollout
+        self._representative_moves = None
+        if symmetry_turns > 0:
+            from symmetry import representative_moves
+            self._representative_moves = representative_moves
+        self.engine = engine
+        # 搜索用的局面类型，None 表示沿用调用方的局面类型
+        self._engine = None
+        if engine == "bitboard":
+            from bitboard import BitboardGameState
+            self._engine = BitboardGameState
+        self.endgame_leaves = endgame_leaves
+        self.collect_stats = collect_stats
+        self.stats_interval = stats_interval
+        # 最近一次 find_best_move 的 SearchStats (未启用统计、开局库或终局求解直接给出走法、根并行时为 None)
+        self.last_stats = None
+        self._endgame = EndgameSolver() if endgame_leaves > 0 else None
+        self._book = opening_book
+        if isinstance(opening_book, str):
+            from opening_book import OpeningBook
+            self._book = OpeningBook(opening_book)
+
+    def find_best_move(self, initial_state: GameState, stop=None, on_progress=None, on_stats=None):
+        """
+        搜索并返回最佳走法，无棋可下时返回 None。
+        stop (threading.Event) 被设置时尽快结束搜索，按已有的统计返回走法；
+        on_progress 见 SearchBudget。启用统计时，on_stats(SearchStats) 每 stats_interval 次模拟调用一次，
+        回调在搜索线程中执行。根并行模式不支持这三个参数。
+        """
+        self.last_stats = None
+        if self._book is not None:
+            book_move = self._book.lookup(initial_state)
+            if book_move is not None:
+                # 没有搜索，保留的搜索树不再对应之后的局面
+                self.reset()
+                return book_move
 
-    def find_best_move(self, initial_state: GameState):
-        root = MCTSNode(state=initial_state)
-
-        for _ in range(self.simulations_per_move):
-            node = root
-            state = initial_state.clone()
-
-            # 1. 选择 (Selection)
-            while node.untried_moves == [] and node.children != []:
-                node = node.select_child(self.C)
-                state.make_move(node.move)
-
-            # 2. 扩展 (Expansion)
-            if node.untried_moves != []:
-                node = node.expand()
-                state.make_move(node.move)
-
-            # 3. 模拟 (Simulation)
-            while not state.is_terminal():
-                legal_moves = state.get_legal_moves()
-                if not legal_moves: break
-                state.make_move(random.choice(legal_moves))
-
-            # 4. 反向传播 (Backpropagation)
-            winner = state.get_winner()
-            while node is not None:
-                node.visits += 1
-                # 如果是轮到该节点的玩家赢了，则增加胜利次数
-                # 注意：node.state.current_player 是 *下一个* 玩家
-                # 所以我们要比较winner和上一个玩家
-                if (3 - node.state.current_player) == winner:
-                    node.wins += 1
-                node = node.parent
-
-        if not root.children:
+        budget = self._budget(stop=stop, on_progress=on_progress)
+        if self._endgame is not None and estimated_leaves(initial_state) <= self.endgame_leaves:
+            # 求解在复制的状态上进行，调用方的状态不受影响。计时模式下只用一部分思考时间，
+            # 超时或收到停止信号时放弃求解，回到 MCTS 搜索 (停止时 MCTS 也随即结束)
+            deadline = None
+            if budget.deadline is not None:
+                deadline = budget.start + ENDGAME_TIME_SHARE * (budget.deadline - budget.start)
+            move, result = self._endgame.solve(self._working_state(initial_state), deadline, stop)
+            if result is not None:
+                self.reset()
+                return move
+
+        if self.workers > 1 and self.parallel == "root":
+            # 根并行的搜索树分散在各进程中，不做子树复用；各进程只用剩下的思考时间
+            think_time_ms = None
+            if budget.deadline is not None:
+                think_time_ms = max(1000 * (budget.deadline - time.perf_counter()), 1)
+            stats = self._parallel_root_statistics(initial_state, think_time_ms)
+            if not stats:
+                # 如果没有合法走法（不太可能发生，除非开局就无路可走）
+                return None
+            return max(stats, key=lambda move: stats[move][0])
+
+        tree, state = self._take_root(initial_state)
+        if self.collect_stats:
+            timed = _TimedTree(tree, SearchStats(), on_stats, self.stats_interval)
+            self._run_search(timed, state, budget)
+            timed.finish()
+            self.last_stats = timed.stats
+        else:
+            self._run_search(tree, state, budget)
+
+        stats = tree.root_stats()
+        if not stats:
             # 如果没有合法走法（不太可能发生，除非开局就无路可走）
+            self.reset()
             return None
 
         # 选择访问次数最多的子节点，作为最稳健的走法
-        best_child = max(root.children, key=lambda c: c.visits)
-        return best_child.move
+        best_move = max(stats, key=lambda s: s[1])[0]
+        if self.reuse_tree:
+            # 树根移到所选子节点，工作状态随之落子
+            state.make_move(best_move)
+            if not tree.advance(best_move, state):
+                self.reset()
+        else:
+            self.reset()
+        return best_move
+
+    def _run_search(self, tree, state: GameState, budget: SearchBudget):
+        if self.workers > 1:
+            self._search_tree_parallel(tree, state, budget)
+        elif self._batch_rollout is not None:
+            self._search_batched(tree, state, budget)
+        else:
+            self._search(tree, state, budget)
+
+    def ponder(self, initial_state: GameState, budget: SearchBudget) -> int:
+        """
+        后台思考：对手考虑期间 (通常在另一个线程中) 从 initial_state 继续扩展保留的搜索树，
+        直到 budget 用完 (一般由 budget.stop 通知)。对手落子后 find_best_move 或 follow
+        会把对应的子树提升为树根，后台积累的统计继续有效。返回本次的模拟次数。
+        根并行不保留搜索树，不做后台思考。调用期间不要在其他线程中使用这个 AI。
+        """
+        if not self.reuse_tree or (self.workers > 1 and self.parallel == "root"):
+            return 0
+        tree, state = self._take_root(initial_state)
+        self._run_search(tree, state, budget)
+        return budget.done
+
+    def follow(self, state: GameState) -> int:
+        """
+        对局推进到 state 后调用：把保留的搜索树移到对应的节点 (找不到时丢弃)，
+        返回新树根已有的访问次数，即可以沿用的搜索量。
+        """
+        if not self.reuse_tree or (self.workers > 1 and self.parallel == "root"):
+            return 0
+        tree, _ = self._take_root(state)
+        return sum(visits for _, visits, _ in tree.root_stats())
+
+    def _budget(self, simulations=None, early_stop=None, **kwargs) -> SearchBudget:
+        """
+        本次搜索的预算。固定次数模式下为 simulations (默认 simulations_per_move) 次，
+        计时模式下为 think_time_ms 毫秒，simulations (默认 max_simulations) 为可选上限。
+        early_stop 默认只在计时模式下开启，固定次数模式的模拟次数保持不变。
+        其余参数 (stop / on_progress) 原样传给 SearchBudget。
+        """
+        if early_stop is None:
+            early_stop = self.think_time_ms is not None
+        if self.think_time_ms is None:
+            if simulations is None:
+                simulations = self.simulations_per_move
+            return SearchBudget(simulations, early_stop=early_stop, **kwargs)
+        if simulations is None:
+            simulations = self.max_simulations
+        return SearchBudget(simulations, self.think_time_ms, early_stop, **kwargs)
+
+    def reset(self):
+        """丢弃保留的搜索树 (新开一局时调用)"""
+        self._tree = None
+        self._root_state = None
+        if self._table is not None:
+            self._table.clear()
+
+    def _working_state(self, state: GameState):
+        """搜索用的工作状态：state 的副本，engine 为 "bitboard" 时转换为 BitboardGameState"""
+        if self._engine is None or isinstance(state, self._engine):
+            return state.clone()
+        return self._engine.from_state(state)
+
+    def _new_tree(self, state: GameState):
+        """以 state 为根新建一棵搜索树，置换表随之清空"""
+        prune = self._prune_symmetric if self._representative_moves is not None else None
+        if self.tree == "array":
+            return ArrayTree(state, self.C, prune=prune)
+        return NodeTree(state, self.C, self._table, prune)
+
+    def _prune_symmetric(self, state: GameState, moves: list) -> list:
+        """对称剪枝：只在前 symmetry_turns 回合检查局面的对称性，之后对称几乎不会出现"""
+        if state.turn_count >= self.symmetry_turns:
+            return moves
+        return self._representative_moves(state, moves)
+
+    def _take_root(self, initial_state: GameState):
+        """
+        取得本次搜索的搜索树和工作状态。
+        如果保留的树根就是当前局面，或者对手的应着是树根的某个子节点，直接沿用其统计；
+        否则新建一棵树。
+        """
+        tree, state = self._tree, self._root_state
+        if tree is not None and not state.same_position(initial_state):
+            for move, visits, _ in tree.root_stats():
+                if visits == 0:
+                    continue
+                undo = state.make_move(move)
+                if state.same_position(initial_state):
+                    if not tree.advance(move, state):
+                        tree = None
+                    break
+                state.unmake_move(undo)
+            else:
+                tree = None
+
+        if tree is None:
+            # 整个搜索只复制一次状态，之后通过 make_move / unmake_move 原地推进和回退
+            state = self._working_state(initial_state)
+            tree = self._new_tree(state)
+        self._tree, self._root_state = tree, state
+        return tree, state
+
+    def root_statistics(self, initial_state: GameState, simulations=None) -> Dict[Tuple[int, int], Tuple[int, int]]:
+        """
+        在当前进程内搜索，返回 {根节点走法: (访问次数, 胜利次数)}。
+        统计会与其他进程合并，所以不提前停止。
+        """
+        # 整个搜索只复制一次状态，之后通过 make_move / unmake_move 原地推进和回退
+        state = self._working_state(initial_state)
+        tree = self._new_tree(state)
+
+        budget = self._budget(simulations, early_stop=False)
+        if self._batch_rollout is not None:
+            self._search_batched(tree, state, budget)
+        else:
+            self._search(tree, state, budget)
+
+        return {move: (visits, wins) for move, visits, wins in tree.root_stats() if visits}
+
+    def _get_pool(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    def _parallel_root_statistics(self, initial_state: GameState, think_time_ms=None):
+        """根并行：各进程独立搜索 (计时模式下各搜索 think_time_ms 毫秒)，按走法累加访问次数和胜利次数"""
+        pool = self._get_pool()
+        # 各进程按收到的局面类型搜索，转换只在主进程做一次
+        root_state = self._working_state(initial_state)
+        if think_time_ms is None:
+            think_time_ms = self.think_time_ms
+        total = self.simulations_per_move if self.think_time_ms is None else self.max_simulations
+        futures = []
+        for i in range(self.workers):
+            if total is None:
+                # 只受时间限制，每个进程都搜索到截止时间
+                simulations = None
+            else:
+                share, extra = divmod(total, self.workers)
+                simulations = share + (1 if i < extra else 0)
+                if simulations == 0:
+                    continue
+            # 种子由全局随机数生成器派生，random.seed 同样能复现并行搜索
+            futures.append(pool.submit(
+                _root_search_worker, root_state, self.C, simulations,
+                self.batch_size, self._table.capacity if self._table is not None else 0,
+                think_time_ms, self.symmetry_turns, self.rollout, random.getrandbits(64)))
+
+        merged = {}
+        for future in futures:
+            for move, (visits, wins) in future.result().items():
+                total_visits, total_wins = merged.get(move, (0, 0))
+                merged[move] = (total_visits + visits, total_wins + wins)
+        return merged
+
+    def _search_tree_parallel(self, tree, state: GameState, budget: SearchBudget):
+        """
+        树并行：主进程负责选择、扩展和反向传播，各进程只做模拟。
+        每个进程同时最多有一批叶子在途，一批完成后立即回传结果并领取下一批。
+        """
+        pool = self._get_pool()
+        # 任务参数由后台线程序列化，state 在搜索中会被修改，所以单独保存一份根局面
+        root_state = state.clone()
+        per_worker = self.batch_size if self.batch_size > 1 else TREE_LEAVES_PER_WORKER
+        undo_stack = []
+        in_flight = {}
+        exhausted = False
+
+        while not exhausted or in_flight:
+            while not exhausted and len(in_flight) < self.workers:
+                size = budget.take(tree, per_worker)
+                if size == 0:
+                    exhausted = True
+                    break
+                move_paths = []
+                paths = self._collect_leaves(tree, state, size, undo_stack, move_paths=move_paths)
+                future = pool.submit(_rollout_paths_worker, root_state, move_paths,
+                                     self.batch_size, self._rollout, random.getrandbits(64))
+                in_flight[future] = paths
+
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                self._finish_leaves(tree, in_flight.pop(future), future.result())
+
+    def close(self):
+        """关闭并行搜索使用的进程池"""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def _search(self, tree, state: GameState, budget: SearchBudget):
+        """逐局模拟的搜索循环，state 为根节点局面，结束后恢复原状"""
+        undo_stack = []
+        while budget.take(tree):
+            path = []
+            tree.select_and_expand(state, undo_stack, path)
+            winner = self._rollout(state, undo_stack)
+
+            # 回退到根节点局面，供下一次模拟复用
+            while undo_stack:
+                state.unmake_move(undo_stack.pop())
+
+            # 4. 反向传播 (Backpropagation)：沿本次模拟经过的路径更新统计
+            tree.update(path, 1, winner)
+
+    def _search_batched(self, tree, state: GameState, budget: SearchBudget):
+        """批量模拟的搜索循环：每轮选出一批叶子，统一交给 NumPy 引擎模拟"""
+        batch_rollout = self._batch_rollout
+        # 用全局随机数生成器派生种子，random.seed 同样能复现批量搜索
+        rng = batch_rollout.np.random.default_rng(random.getrandbits(64))
+        undo_stack = []
+        while True:
+            size = budget.take(tree, self.batch_size)
+            if size == 0:
+                break
+            batch = batch_rollout.new_batch(size)
+            # 把叶子局面直接写入批量数组，不复制状态对象
+            paths = self._collect_leaves(tree, state, size, undo_stack,
+                                         on_leaf=lambda i, leaf_state: batch_rollout.store_state(batch, i, leaf_state))
+            winners = batch_rollout.play_out(*batch, rng=rng)
+            self._finish_leaves(tree, paths, winners.tolist())
+
+    def _collect_leaves(self, tree, state: GameState, count: int, undo_stack: list,
+                        on_leaf=None, move_paths=None):
+        """
+        连续选出 count 个待模拟的叶子，返回它们的节点路径列表。每选出一个就对其路径施加虚拟失败
+        (访问次数 +virtual_loss，胜利次数不变)，同一批后续的选择会避开这条路径，
+        也不会遇到访问次数为0的子节点。on_leaf(i, state) 在回退前以叶子局面调用；
+        给出 move_paths 时，同时记录从根到每个叶子的走法序列。
+        """
+        paths = []
+        for i in range(count):
+            path = []
+            moves = [] if move_paths is not None else None
+            tree.select_and_expand(state, undo_stack, path, moves)
+            if on_leaf is not None:
+                on_leaf(i, state)
+            while undo_stack:
+                state.unmake_move(undo_stack.pop())
+
+            tree.update(path, self.virtual_loss, None)
+            paths.append(path)
+            if move_paths is not None:
+                move_paths.append(moves)
+        return paths
+
+    def _finish_leaves(self, tree, paths, winners):
+        """撤销虚拟失败并按真实模拟结果反向传播"""
+        correction = 1 - self.virtual_loss
+        for path, winner in zip(paths, winners):
+            tree.update(path, correction, winner)
 
 
 # --- 4. 主游戏循环 ---
 
 if __name__ == "__main__":
     game = GameState()
-    ai = MCTS_AI(simulations_per_move=1000)  # 模拟次数越多，AI越强，但耗时越长
+    # 模拟次数越多，AI越强，但耗时越长。
+    # 双方共用同一个AI，每一步都沿用上一步保留的搜索树
+    ai = MCTS_AI(simulations_per_move=1000)
 
     print("AI vs AI 开始！")
     game.display()
@@ -275,8 +1413,7 @@ if __name__ == "__main__":
 
         if best_move is None:
             print(f"{player_name} 无棋可下，跳过回合。")
-            game.turn_count += 1
-            game.current_player = 3 - game.current_player
+            game.pass_turn()
             continue
 
         print(f"AI 选择落子在: {best_move}")
@@ -297,6 +1434,5 @@ if __name__ == "__main__":
     else:
         print("游戏平局!")
 
-    black_score = sum(row.count(1) for row in game.territory)
-    white_score = sum(row.count(2) for row in game.territory)
+    black_score, white_score = game.score()
     print(f"最终比分: Black {black_score} vs White {white_score}")
@@ -0,0 +1,140 @@
+"""
+对称开局库：离线对前几手进行深度搜索，按对称规范化的局面键保存最佳走法，
+MCTS_AI(opening_book=...) 启动时以内存映射方式打开，开局阶段直接查表落子。
+
+文件格式 (小端):
+  文件头 magic(4字节) 版本(uint16) 最大手数(uint16) 记录数(uint32)
+  记录按键升序排列，每条为 键(uint64) 规范化局面中的走法格子编号(uint8) 胜率千分比(uint16)
+
+用法: python opening_book.py --plies 4 --width 3 --simulations 20000 --output opening_book.bin
+"""
+import argparse
+import mmap
+import random
+import struct
+import time
+
+from mcts import GameState, MCTS_AI, _MOVES
+from symmetry import INVERSE, SYMMETRIES, canonical_key, transform_move
+
+MAGIC = b"PCOB"
+VERSION = 1
+_HEADER = struct.Struct("<4sHHI")
+_RECORD = struct.Struct("<QBH")
+
+
+class OpeningBook:
+    """
+    以 mmap 打开的开局库文件，查询时在映射上二分查找，不把记录读入内存。
+    只查询回合数不超过建库手数的局面。
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.max_ply, self.count = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            self._map.close()
+            raise ValueError(f"{path} 不是有效的开局库文件")
+
+    def __len__(self):
+        return self.count
+
+    def _key_at(self, i: int) -> int:
+        return _RECORD.unpack_from(self._map, _HEADER.size + i * _RECORD.size)[0]
+
+    def entry(self, state):
+        """查询 state，命中时返回 (走法, 胜率)，走法已映射回 state 本身的坐标；否则返回 None"""
+        if state.turn_count >= self.max_ply:
+            return None
+        key, sym = canonical_key(state)
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key_at(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo == self.count:
+            return None
+        found, idx, permille = _RECORD.unpack_from(self._map, _HEADER.size + lo * _RECORD.size)
+        if found != key:
+            return None
+        r, c = transform_move(_MOVES[idx], INVERSE[sym])
+        # 哈希碰撞或文件损坏时可能给出非法走法，交回给搜索
+        if state.board[r][c] != 0 or state.territory[r][c] == 3 - state.current_player:
+            return None
+        return (r, c), permille / 1000
+
+    def lookup(self, state):
+        """查询 state 的库内走法，未命中时返回 None"""
+        entry = self.entry(state)
+        return entry[0] if entry is not None else None
+
+    def close(self):
+        self._map.close()
+
+
+def build_book(plies=4, width=3, simulations=20000, batch_size=1, verbose=True):
+    """
+    从空棋盘出发逐层展开：每个局面用 simulations 次模拟搜索，记录访问次数最多的走法，
+    再沿访问次数最多的 width 个走法进入下一层，直到 plies 手。
+    互相对称的局面只搜索一次。返回 {规范化键: (规范化走法编号, 胜率千分比)}。
+    """
+    entries = {}
+    frontier = [GameState()]
+    for ply in range(plies):
+        next_frontier = []
+        for state in frontier:
+            key, sym = canonical_key(state)
+            if key in entries:
+                continue
+            start = time.perf_counter()
+            ai = MCTS_AI(simulations_per_move=simulations, batch_size=batch_size, reuse_tree=False)
+            stats = ai.root_statistics(state)
+            if not stats:
+                continue
+            ranked = sorted(stats, key=lambda move: stats[move][0], reverse=True)
+            best = ranked[0]
+            visits, wins = stats[best]
+            entries[key] = (SYMMETRIES[sym][best[0] * 9 + best[1]], round(1000 * wins / visits))
+            if verbose:
+                print(f"第 {ply + 1} 手: 已收录 {len(entries)} 个局面，最佳 {best} 胜率 {wins / visits:.1%}"
+                      f" ({time.perf_counter() - start:.1f}s)")
+            for move in ranked[:width]:
+                child = state.clone()
+                child.make_move(move)
+                next_frontier.append(child)
+        frontier = next_frontier
+    return entries
+
+
+def write_book(entries: dict, max_ply: int, path: str):
+    """按键排序写出开局库文件"""
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, max_ply, len(entries)))
+        for key in sorted(entries):
+            idx, permille = entries[key]
+            f.write(_RECORD.pack(key, idx, permille))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="生成对称开局库")
+    parser.add_argument("--plies", type=int, default=4, help="收录的手数")
+    parser.add_argument("--width", type=int, default=3, help="每个局面沿访问次数最多的几个走法继续展开")
+    parser.add_argument("--simulations", type=int, default=20000, help="每个局面的模拟次数")
+    parser.add_argument("--batch-size", type=int, default=1, help="每批模拟的叶子数 (>1 需要 numpy)")
+    parser.add_argument("--seed", type=int, default=None, help="随机种子")
+    parser.add_argument("--output", default="opening_book.bin", help="输出文件")
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        random.seed(args.seed)
+    entries = build_book(args.plies, args.width, args.simulations, args.batch_size)
+    write_book(entries, args.plies, args.output)
+    print(f"已写入 {args.output}: {len(entries)} 个局面")
+
+
+if __name__ == "__main__":
+    main()
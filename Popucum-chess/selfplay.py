@@ -0,0 +1,277 @@
+"""
+自我对弈数据：在进程池中让 MCTS_AI 自我对弈，把每一步搜索过的局面写成定长记录，
+按分片文件存放，可以直接用 NumPy 内存映射读取，数千万个局面也不必读入内存。
+
+分片文件格式 (小端):
+  文件头 magic(4字节) 版本(uint16) 记录长度(uint16) 保留(8字节)
+  之后是连续的记录，每条 RECORD_SIZE 字节:
+    planes      4 x 11 字节  黑子、白子、黑方领地、白方领地四个位平面，格子 idx = r * 9 + c 对应第 idx 位
+                             (按字节从低位到高位，np.unpackbits(..., bitorder="little") 展开)
+    player      uint8        行棋方 (1: 黑, 2: 白)
+    turn        uint8        回合数
+    winner      uint8        这局的最终胜者 (0: 平局, 1: 黑胜, 2: 白胜)
+    reserved    uint8
+    simulations uint32       根节点的总访问次数，局面没有经过搜索 (开局库或终局求解直接给出走法) 时为0
+    visits      81 x uint16  根节点各走法的访问比例，乘以65535后取整；没有搜索时所选走法为65535。
+                             对称剪枝 (MCTS_AI 的 symmetry_turns) 时每组对称走法只有代表有访问次数
+写入时追加到目录中最后一个未满的分片，写满 shard_size 条后开始新的分片。
+
+用法: python selfplay.py --games 1000 --processes 8 --output selfplay_data \\
+          --config '{"simulations_per_move": 800}'
+读取: records = open_dataset("selfplay_data")  # 每个分片一个 numpy.memmap
+"""
+import argparse
+import glob
+import json
+import os
+import random
+import re
+import struct
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from mcts import GameState, MCTS_AI, _MOVES
+
+try:
+    import numpy as np
+except ImportError:
+    # 生成数据不需要 numpy，只有读取时需要
+    np = None
+
+MAGIC = b"PCSP"
+VERSION = 1
+_HEADER = struct.Struct("<4sHH8x")
+_RECORD = struct.Struct("<44s4BI81H")
+RECORD_SIZE = _RECORD.size
+
+# 与 _RECORD 逐字节对应的 NumPy 结构化类型
+RECORD_DTYPE = None if np is None else np.dtype([
+    ("planes", "u1", (4, 11)),
+    ("player", "u1"),
+    ("turn", "u1"),
+    ("winner", "u1"),
+    ("reserved", "u1"),
+    ("simulations", "<u4"),
+    ("visits", "<u2", (81,)),
+])
+
+# 默认每个分片的记录数 (约214MB)
+DEFAULT_SHARD_SIZE = 1_000_000
+
+# 每个进程同时在途的对局数
+GAMES_PER_PROCESS_IN_FLIGHT = 2
+
+# 进程内缓存的 AI：配置的 JSON -> MCTS_AI
+_AI_CACHE = {}
+
+
+def _pack_planes(state) -> bytes:
+    """局面的四个位平面，共44字节"""
+    planes = [0, 0, 0, 0]
+    board, territory = state.board, state.territory
+    for idx, (r, c) in enumerate(_MOVES):
+        stone, owner = board[r][c], territory[r][c]
+        if stone:
+            planes[stone - 1] |= 1 << idx
+        if owner:
+            planes[owner + 1] |= 1 << idx
+    return b"".join(plane.to_bytes(11, "little") for plane in planes)
+
+
+def _visit_distribution(stats, move):
+    """根节点的 (总访问次数, 81个格子的访问比例)，stats 为 None 时只有所选走法"""
+    visits = [0] * 81
+    if stats is None:
+        visits[move[0] * 9 + move[1]] = 65535
+        return 0, visits
+    total = sum(count for _, count, _ in stats.root_children)
+    for (r, c), count, _ in stats.root_children:
+        visits[r * 9 + c] = round(65535 * count / total) if total else 0
+    return total, visits
+
+
+def play_selfplay_game(config_json: str, random_plies: int, seed: int):
+    """
+    进程池中执行的一局自我对弈，返回 (记录数, 所有记录拼接成的字节串)。
+    前 random_plies 手随机落子以增加对局的多样性，这些局面不记录。
+    """
+    random.seed(seed)
+    ai = _AI_CACHE.get(config_json)
+    if ai is None:
+        ai = _AI_CACHE[config_json] = MCTS_AI(**{**json.loads(config_json), "collect_stats": True})
+    ai.reset()
+
+    game = GameState()
+    positions = []
+    while not game.is_terminal():
+        if game.turn_count < random_plies:
+            move = game.random_legal_move()
+        else:
+            planes, player, turn = _pack_planes(game), game.current_player, game.turn_count
+            move = ai.find_best_move(game)
+            if move is not None:
+                simulations, visits = _visit_distribution(ai.last_stats, move)
+                positions.append((planes, player, turn, simulations, visits))
+        if move is None:
+            # 无棋可下，跳过回合
+            game.pass_turn()
+        else:
+            game.make_move(move)
+
+    winner = game.get_winner()
+    data = b"".join(_RECORD.pack(planes, player, turn, winner, 0, min(simulations, 0xFFFFFFFF), *visits)
+                    for planes, player, turn, simulations, visits in positions)
+    return len(positions), data
+
+
+class ShardWriter:
+    """
+    按分片写入记录：目录中已有分片时追加到最后一个，写满 shard_size 条后新建下一个分片。
+    分片文件名为 prefix-00000.bin、prefix-00001.bin ...
+    """
+
+    def __init__(self, directory: str, shard_size=DEFAULT_SHARD_SIZE, prefix="selfplay"):
+        self.directory = directory
+        self.shard_size = shard_size
+        self.prefix = prefix
+        self.records = 0
+        os.makedirs(directory, exist_ok=True)
+        shards = shard_paths(directory, prefix)
+        # 新分片编号接在已有的最大编号之后 (分片可能被删除过，编号不一定连续)
+        self._index = max((_shard_index(path, prefix) for path in shards), default=-1)
+        self._file = None
+        self._count = shard_size  # 没有分片时，第一次写入就会新建
+        if shards:
+            self._count = _record_count(shards[-1])
+            if self._count < shard_size:
+                # 从最后一条完整记录之后接着写，截掉上次中断时留下的不完整记录
+                self._file = open(shards[-1], "r+b")
+                self._file.truncate(_HEADER.size + self._count * RECORD_SIZE)
+                self._file.seek(0, os.SEEK_END)
+
+    def _next_shard(self):
+        if self._file is not None:
+            self._file.close()
+        self._index += 1
+        path = os.path.join(self.directory, f"{self.prefix}-{self._index:05d}.bin")
+        # "xb": 文件已经存在时报错，绝不覆盖已有的分片
+        self._file = open(path, "xb")
+        self._file.write(_HEADER.pack(MAGIC, VERSION, RECORD_SIZE))
+        self._count = 0
+
+    def write(self, count: int, data: bytes):
+        """写入 count 条记录 (data 为它们拼接成的字节串)，跨越分片边界时自动切分"""
+        offset = 0
+        while count:
+            if self._count >= self.shard_size:
+                self._next_shard()
+            n = min(count, self.shard_size - self._count)
+            self._file.write(data[offset:offset + n * RECORD_SIZE])
+            offset += n * RECORD_SIZE
+            self._count += n
+            self.records += n
+            count -= n
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def _shard_index(path: str, prefix="selfplay") -> int:
+    """分片文件名中的编号，文件名不符合 prefix-编号.bin 时返回 -1"""
+    match = re.fullmatch(re.escape(prefix) + r"-(\d+)\.bin", os.path.basename(path))
+    return int(match.group(1)) if match else -1
+
+
+def shard_paths(directory: str, prefix="selfplay"):
+    """目录中的所有分片文件，按编号排序"""
+    paths = glob.glob(os.path.join(directory, f"{prefix}-*.bin"))
+    return sorted((path for path in paths if _shard_index(path, prefix) >= 0),
+                  key=lambda path: _shard_index(path, prefix))
+
+
+def _record_count(path: str) -> int:
+    """检查分片的文件头，返回其中的记录数"""
+    with open(path, "rb") as f:
+        header = f.read(_HEADER.size)
+    if len(header) < _HEADER.size:
+        raise ValueError(f"{path} 不是有效的自我对弈数据文件")
+    magic, version, record_size = _HEADER.unpack(header)
+    if magic != MAGIC or version != VERSION or record_size != RECORD_SIZE:
+        raise ValueError(f"{path} 不是有效的自我对弈数据文件")
+    # 写入中断时末尾可能有不完整的记录，忽略它
+    return (os.path.getsize(path) - _HEADER.size) // RECORD_SIZE
+
+
+def open_shard(path: str):
+    """以只读内存映射打开一个分片，返回 RECORD_DTYPE 的 numpy.memmap (需要 numpy)"""
+    if np is None:
+        raise ImportError("读取自我对弈数据需要 numpy。运行 'pip install numpy' 来安装。")
+    count = _record_count(path)
+    if count == 0:
+        return np.zeros(0, dtype=RECORD_DTYPE)
+    return np.memmap(path, dtype=RECORD_DTYPE, mode="r", offset=_HEADER.size, shape=(count,))
+
+
+def open_dataset(directory: str, prefix="selfplay"):
+    """以内存映射打开目录中的所有分片，返回 numpy.memmap 的列表"""
+    return [open_shard(path) for path in shard_paths(directory, prefix)]
+
+
+def unpack_planes(records):
+    """把记录的位平面展开为 (记录数, 4, 9, 9) 的 0/1 数组 (只展开传入的这部分记录)"""
+    bits = np.unpackbits(records["planes"], axis=-1, count=81, bitorder="little")
+    return bits.reshape(len(records), 4, 9, 9)
+
+
+def generate(games: int, directory: str, config: dict, processes=None, shard_size=DEFAULT_SHARD_SIZE,
+             random_plies=2, seed=None, verbose=True) -> int:
+    """在进程池中进行 games 局自我对弈，记录写入 directory 中的分片，返回本次写入的记录数"""
+    if config.get("workers", 1) > 1:
+        raise ValueError("自我对弈在进程池中运行，配置中不能再使用多进程搜索 (workers)")
+    processes = processes or os.cpu_count() or 1
+    rng = random.Random(seed)
+    config_json = json.dumps(config, sort_keys=True)
+    writer = ShardWriter(directory, shard_size)
+    start = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            submitted = finished_games = 0
+            in_flight = set()
+            while submitted < games or in_flight:
+                while submitted < games and len(in_flight) < processes * GAMES_PER_PROCESS_IN_FLIGHT:
+                    in_flight.add(pool.submit(play_selfplay_game, config_json, random_plies, rng.getrandbits(64)))
+                    submitted += 1
+                finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    # 每局结束就写入，不在内存中积累
+                    writer.write(*future.result())
+                    finished_games += 1
+                if verbose:
+                    elapsed = time.perf_counter() - start
+                    print(f"{finished_games}/{games} 局, {writer.records} 个局面, "
+                          f"{writer.records / max(elapsed, 1e-9):.1f} 局面/秒")
+    finally:
+        writer.close()
+    return writer.records
+
+
+def main():
+    parser = argparse.ArgumentParser(description="生成自我对弈数据 (可内存映射的定长记录)")
+    parser.add_argument("--games", type=int, default=100, help="对局数")
+    parser.add_argument("--processes", type=int, default=None, help="进程数 (默认为 CPU 核数)")
+    parser.add_argument("--output", default="selfplay_data", help="输出目录，已有分片时追加")
+    parser.add_argument("--config", default="{}", help="MCTS_AI 的参数 (JSON)")
+    parser.add_argument("--shard-size", type=int, default=DEFAULT_SHARD_SIZE, help="每个分片的记录数")
+    parser.add_argument("--random-plies", type=int, default=2, help="开局随机落子的手数 (不记录)")
+    parser.add_argument("--seed", type=int, default=None, help="随机种子")
+    args = parser.parse_args()
+
+    written = generate(args.games, args.output, json.loads(args.config), args.processes,
+                       args.shard_size, args.random_plies, args.seed)
+    print(f"已写入 {written} 个局面到 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+棋盘的8种二面体对称 (4种旋转 x 是否翻转)。
+三连的四个方向在这些变换下互相对应，领地也沿同一直线扩散，所以规则不变：
+对称的两个局面胜负相同，最佳走法也按同一变换对应。
+"""
+from typing import List, Tuple
+
+from mcts import _MOVES, _ZOBRIST_STONE, _ZOBRIST_TERRITORY, _zobrist_turn
+
+
+def _transform(r: int, c: int, sym: int) -> Tuple[int, int]:
+    """对坐标 (r, c) 顺时针旋转 sym % 4 次，sym >= 4 时再左右翻转"""
+    for _ in range(sym % 4):
+        r, c = c, 8 - r
+    if sym >= 4:
+        c = 8 - c
+    return r, c
+
+
+# SYMMETRIES[sym][idx]: 格子 idx 经第 sym 种变换后的格子编号，第0种为恒等变换
+SYMMETRIES = tuple(tuple(r2 * 9 + c2 for r2, c2 in (_transform(r, c, sym) for r, c in _MOVES)) for sym in range(8))
+# INVERSE[sym]: 第 sym 种变换的逆变换
+INVERSE = tuple(
+    next(inv for inv in range(8) if all(SYMMETRIES[inv][SYMMETRIES[sym][idx]] == idx for idx in range(81)))
+    for sym in range(8)
+)
+
+
+def transform_move(move: Tuple[int, int], sym: int) -> Tuple[int, int]:
+    """把走法 (r, c) 映射到第 sym 种变换后的局面中"""
+    return _MOVES[SYMMETRIES[sym][move[0] * 9 + move[1]]]
+
+
+def _occupied_cells(state):
+    """局面中所有非空的 (格子编号, 棋子, 领地)"""
+    board, territory = state.board, state.territory
+    return [(idx, board[r][c], territory[r][c]) for idx, (r, c) in enumerate(_MOVES)
+            if board[r][c] or territory[r][c]]
+
+
+def symmetric_hashes(state) -> List[int]:
+    """局面经8种变换后各自的 Zobrist 哈希 (与 GameState.zobrist 使用同一组随机键)"""
+    cells = _occupied_cells(state)
+    base = _zobrist_turn(state.turn_count, state.current_player)
+    hashes = []
+    for perm in SYMMETRIES:
+        h = base
+        for idx, stone, owner in cells:
+            target = perm[idx]
+            if stone:
+                h ^= _ZOBRIST_STONE[stone][target]
+            if owner:
+                h ^= _ZOBRIST_TERRITORY[owner][target]
+        hashes.append(h)
+    return hashes
+
+
+def canonical_key(state) -> Tuple[int, int]:
+    """
+    对称规范化的局面键：8种变换后哈希的最小值。
+    返回 (键, 取得最小值的变换)，互相对称的局面得到相同的键。
+    """
+    hashes = symmetric_hashes(state)
+    key = min(hashes)
+    return key, hashes.index(key)
+
+
+def preserved_symmetries(state) -> List[int]:
+    """局面在哪些变换下保持不变 (总是包含恒等变换0)"""
+    cells = _occupied_cells(state)
+    grid = {idx: (stone, owner) for idx, stone, owner in cells}
+    return [sym for sym, perm in enumerate(SYMMETRIES)
+            if all(grid.get(perm[idx]) == value for idx, value in grid.items())]
+
+
+def representative_moves(state, moves: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """
+    局面保持某些对称时，互相对称的走法结果相同，每组只保留格子编号最小的一个 (保持 moves 的顺序)；
+    局面没有对称性时原样返回 moves。
+    """
+    syms = preserved_symmetries(state)
+    if len(syms) == 1:
+        return moves
+    perms = [SYMMETRIES[sym] for sym in syms[1:]]
+    return [move for move in moves
+            if all(perm[move[0] * 9 + move[1]] >= move[0] * 9 + move[1] for perm in perms)]
@@ -0,0 +1,125 @@
+"""
+规则引擎的回归测试：按固定种子随机对弈，每一步都与最初版本的规则 (下面的 _reference_move，
+逐行照搬自最初的 GameState.make_move) 比较，并在每次 make_move / unmake_move 之后
+调用 check_consistency() 校验增量维护的领地计数、合法落子集合和 Zobrist 哈希。
+
+用法: python -m pytest test_rules.py
+"""
+import random
+
+import pytest
+
+from bitboard import BitboardGameState
+from mcts import GameState
+
+ENGINES = [GameState, BitboardGameState]
+SEEDS = range(30)
+
+
+# --- 1. 最初版本的规则 ---
+
+def _reference_legal_moves(board, territory, player):
+    return [(r, c) for r in range(9) for c in range(9)
+            if board[r][c] == 0 and territory[r][c] in (0, player)]
+
+
+def _reference_move(board, territory, player, move):
+    """在 board / territory 上就地执行 player 的一步棋"""
+    r, c = move
+    board[r][c] = player
+    threes = []
+    for dr, dc in [(0, 1), (1, 0), (1, 1), (1, -1)]:
+        for i in range(-2, 1):
+            line = [(r + (i + k) * dr, c + (i + k) * dc) for k in range(3)]
+            if all(0 <= pr < 9 and 0 <= pc < 9 and board[pr][pc] == player for pr, pc in line):
+                threes.append((line, (dr, dc)))
+    if not threes:
+        return
+    for line, _ in threes:
+        for pr, pc in line:
+            board[pr][pc] = 0
+            territory[pr][pc] = player
+    for line, (dr, dc) in threes:
+        ends = (max(line, key=lambda p: p[0] * dr + p[1] * dc), (dr, dc)), \
+               (min(line, key=lambda p: p[0] * dr + p[1] * dc), (-dr, -dc))
+        for (pr, pc), (sr, sc) in ends:
+            pr, pc = pr + sr, pc + sc
+            while 0 <= pr < 9 and 0 <= pc < 9 and board[pr][pc] != 3 - player:
+                territory[pr][pc] = player
+                pr, pc = pr + sr, pc + sc
+
+
+def _snapshot(state):
+    return ([row[:] for row in state.board], [row[:] for row in state.territory],
+            state.current_player, state.turn_count, state.score(), state.zobrist)
+
+
+# --- 2. 测试 ---
+
+@pytest.mark.parametrize("engine", ENGINES, ids=lambda cls: cls.__name__)
+@pytest.mark.parametrize("seed", SEEDS)
+def test_random_game_matches_reference_rules(engine, seed):
+    """随机对局的每一步，合法落子、棋盘、领地和比分都与最初的规则一致"""
+    rng = random.Random(seed)
+    state = engine()
+    board = [[0] * 9 for _ in range(9)]
+    territory = [[0] * 9 for _ in range(9)]
+    player = 1
+    while not state.is_terminal():
+        legal = _reference_legal_moves(board, territory, player)
+        assert state.get_legal_moves() == legal
+        if not legal:
+            state.pass_turn()
+            player = 3 - player
+            continue
+        move = rng.choice(legal)
+        state.make_move(move)
+        _reference_move(board, territory, player, move)
+        player = 3 - player
+
+        assert state.board == board
+        assert state.territory == territory
+        assert state.current_player == player
+        assert state.score() == (sum(row.count(1) for row in territory), sum(row.count(2) for row in territory))
+        state.check_consistency()
+
+    black, white = state.score()
+    assert state.get_winner() == (1 if black > white else 2 if white > black else 0)
+
+
+@pytest.mark.parametrize("engine", ENGINES, ids=lambda cls: cls.__name__)
+@pytest.mark.parametrize("seed", SEEDS)
+def test_unmake_move_restores_every_position(engine, seed):
+    """逐步回退一整局，每一步都恢复到落子前的局面，增量维护的数据仍然一致"""
+    random.seed(seed)
+    state = engine()
+    history = []
+    while not state.is_terminal():
+        move = state.random_legal_move()
+        if move is None:
+            break
+        before = _snapshot(state)
+        history.append((before, state.make_move(move)))
+        state.check_consistency()
+
+    while history:
+        before, undo = history.pop()
+        state.unmake_move(undo)
+        state.check_consistency()
+        assert _snapshot(state) == before
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_engines_agree_on_zobrist_hash(seed):
+    """两种引擎走同样的棋，每一步的 Zobrist 哈希相同"""
+    rng = random.Random(seed)
+    state, bitboard = GameState(), BitboardGameState()
+    while not state.is_terminal():
+        legal = state.get_legal_moves()
+        if not legal:
+            break
+        move = rng.choice(legal)
+        state.make_move(move)
+        bitboard.make_move(move)
+        assert state.zobrist == bitboard.zobrist
+        assert bitboard.same_position(state)
@@ -0,0 +1,201 @@
+"""
+无界面的对局赛：两种 MCTS_AI 配置在进程池中对弈大量对局，轮流执黑，
+统计胜/平/负、Elo 差及其置信区间，并用序贯概率比检验 (SPRT) 判断改动是否确有提升，
+结论明确时可以提前结束。
+
+配置为 MCTS_AI 构造参数的 JSON，两边共同的参数用 --common 给出。
+用法: python tournament.py --games 2000 --processes 8 --common '{"simulations_per_move": 1000}' \\
+          --a '{"rollout": "heuristic"}' --b '{}' --sprt --elo0 0 --elo1 20
+"""
+import argparse
+import json
+import math
+import os
+import random
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from mcts import GameState, MCTS_AI
+
+# 每个进程同时在途的对局数，保证进程一直有活干，又不会在 SPRT 提前结束时积压太多
+GAMES_PER_PROCESS_IN_FLIGHT = 2
+
+# 进程内缓存的 AI：配置的 JSON -> MCTS_AI，同一进程的后续对局直接复用，不重复初始化
+_AI_CACHE = {}
+
+
+def _get_ai(config_json: str) -> MCTS_AI:
+    ai = _AI_CACHE.get(config_json)
+    if ai is None:
+        ai = _AI_CACHE[config_json] = MCTS_AI(**json.loads(config_json))
+    return ai
+
+
+def play_game(config_a: str, config_b: str, a_is_black: bool, seed: int) -> float:
+    """进程池中执行的一局对弈，返回 A 方的得分 (胜1，平0.5，负0)"""
+    random.seed(seed)
+    ai_a, ai_b = _get_ai(config_a), _get_ai(config_b)
+    ai_a.reset()
+    ai_b.reset()
+    ais = {1: ai_a, 2: ai_b} if a_is_black else {1: ai_b, 2: ai_a}
+    game = GameState()
+    while not game.is_terminal():
+        move = ais[game.current_player].find_best_move(game)
+        if move is None:
+            # 无棋可下，跳过回合
+            game.pass_turn()
+        else:
+            game.make_move(move)
+    winner = game.get_winner()
+    if winner == 0:
+        return 0.5
+    return 1.0 if winner == (1 if a_is_black else 2) else 0.0
+
+
+def expected_score(elo: float) -> float:
+    """Elo 差对应的期望得分"""
+    return 1 / (1 + 10 ** (-elo / 400))
+
+
+def elo_from_score(score: float) -> float:
+    """期望得分对应的 Elo 差，得分为0或1时为无穷"""
+    if score <= 0:
+        return -math.inf
+    if score >= 1:
+        return math.inf
+    return -400 * math.log10(1 / score - 1)
+
+
+def score_stats(wins: int, draws: int, losses: int):
+    """平均得分和每局得分的方差 (按胜平负三项分布)"""
+    n = wins + draws + losses
+    score = (wins + 0.5 * draws) / n
+    variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / n
+    return score, variance
+
+
+def elo_interval(wins: int, draws: int, losses: int, z=1.96):
+    """Elo 差的估计值和置信区间 (默认95%)，返回 (Elo, 下界, 上界)"""
+    score, variance = score_stats(wins, draws, losses)
+    margin = z * math.sqrt(variance / (wins + draws + losses))
+    return elo_from_score(score), elo_from_score(score - margin), elo_from_score(score + margin)
+
+
+def sprt_llr(wins: int, draws: int, losses: int, elo0: float, elo1: float) -> float:
+    """
+    H0: Elo 差为 elo0，H1: Elo 差为 elo1 的对数似然比，
+    按每局得分近似正态分布计算 (与常见引擎测试框架相同的近似)。
+    """
+    n = wins + draws + losses
+    score, variance = score_stats(wins, draws, losses)
+    if variance == 0:
+        return 0.0
+    s0, s1 = expected_score(elo0), expected_score(elo1)
+    return (s1 - s0) * (2 * score - s0 - s1) * n / (2 * variance)
+
+
+def sprt_bounds(alpha=0.05, beta=0.05):
+    """对数似然比的下界 (接受 H0) 和上界 (接受 H1)"""
+    return math.log(beta / (1 - alpha)), math.log((1 - beta) / alpha)
+
+
+def run(config_a: dict, config_b: dict, games=1000, processes=None, seed=None,
+        sprt=False, elo0=0.0, elo1=20.0, alpha=0.05, beta=0.05, verbose=True):
+    """
+    A 对 B 进行最多 games 局对弈，第偶数局 A 执黑。sprt 为 True 时，对数似然比越过界限即停止。
+    返回 {"wins", "draws", "losses", "elo", "elo_low", "elo_high", "llr", "decision", "seconds"}，
+    胜负以 A 方计。
+    """
+    for config in (config_a, config_b):
+        if config.get("workers", 1) > 1:
+            raise ValueError("对局赛在进程池中运行，配置中不能再使用多进程搜索 (workers)")
+    processes = processes or os.cpu_count() or 1
+    rng = random.Random(seed)
+    json_a = json.dumps(config_a, sort_keys=True)
+    json_b = json.dumps(config_b, sort_keys=True)
+    lower, upper = sprt_bounds(alpha, beta)
+    results = [0, 0, 0]  # 胜, 平, 负
+    decision = None
+    llr = 0.0
+    start = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        submitted = 0
+        in_flight = set()
+        while submitted < games or in_flight:
+            while submitted < games and len(in_flight) < processes * GAMES_PER_PROCESS_IN_FLIGHT \
+                    and decision is None:
+                in_flight.add(pool.submit(play_game, json_a, json_b, submitted % 2 == 0, rng.getrandbits(64)))
+                submitted += 1
+            if not in_flight:
+                break
+
+            finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                score = future.result()
+                results[0 if score == 1 else 1 if score == 0.5 else 2] += 1
+
+            wins, draws, losses = results
+            played = wins + draws + losses
+            if decision is None:
+                # 得出结论后 LLR 保持在做出判断时的值，之后结束的对局只计入胜负
+                llr = sprt_llr(wins, draws, losses, elo0, elo1)
+            if verbose:
+                elo, low, high = elo_interval(wins, draws, losses)
+                print(f"{played}/{games} 局: A {wins} 胜 {draws} 平 {losses} 负, "
+                      f"Elo {elo:+.1f} [{low:+.1f}, {high:+.1f}], LLR {llr:+.2f} [{lower:.2f}, {upper:.2f}]")
+            if sprt and decision is None:
+                if llr >= upper:
+                    decision = "H1"
+                elif llr <= lower:
+                    decision = "H0"
+                if decision is not None:
+                    # 已提交的对局还在进行，未开始的取消掉，结束的照常计入
+                    for future in in_flight:
+                        future.cancel()
+                    in_flight = {future for future in in_flight if not future.cancelled()}
+
+    wins, draws, losses = results
+    elo, low, high = elo_interval(wins, draws, losses) if sum(results) else (0.0, -math.inf, math.inf)
+    return {
+        "wins": wins, "draws": draws, "losses": losses,
+        "elo": elo, "elo_low": low, "elo_high": high,
+        "llr": llr, "decision": decision,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="两种 MCTS_AI 配置的对局赛 (Elo 与 SPRT)")
+    parser.add_argument("--a", default="{}", help="A 方的 MCTS_AI 参数 (JSON)")
+    parser.add_argument("--b", default="{}", help="B 方的 MCTS_AI 参数 (JSON)")
+    parser.add_argument("--common", default="{}", help="双方共同的 MCTS_AI 参数 (JSON)，各自的参数优先")
+    parser.add_argument("--games", type=int, default=1000, help="最多对局数")
+    parser.add_argument("--processes", type=int, default=None, help="进程数 (默认为 CPU 核数)")
+    parser.add_argument("--seed", type=int, default=None, help="随机种子")
+    parser.add_argument("--sprt", action="store_true", help="SPRT 得出结论时提前结束")
+    parser.add_argument("--elo0", type=float, default=0.0, help="SPRT 的 H0: A 比 B 强 elo0")
+    parser.add_argument("--elo1", type=float, default=20.0, help="SPRT 的 H1: A 比 B 强 elo1")
+    parser.add_argument("--alpha", type=float, default=0.05, help="第一类错误率")
+    parser.add_argument("--beta", type=float, default=0.05, help="第二类错误率")
+    args = parser.parse_args()
+
+    common = json.loads(args.common)
+    config_a = {**common, **json.loads(args.a)}
+    config_b = {**common, **json.loads(args.b)}
+    result = run(config_a, config_b, args.games, args.processes, args.seed,
+                 args.sprt, args.elo0, args.elo1, args.alpha, args.beta)
+
+    games = result["wins"] + result["draws"] + result["losses"]
+    print("\n--- 对局赛结果 ---")
+    print(f"A: {config_a}\nB: {config_b}")
+    print(f"{games} 局: A {result['wins']} 胜 / {result['draws']} 平 / {result['losses']} 负")
+    print(f"Elo 差 (A - B): {result['elo']:+.1f}, 95% 置信区间 [{result['elo_low']:+.1f}, {result['elo_high']:+.1f}]")
+    verdict = {"H1": f"接受 H1 (A 至少强 {args.elo1:g} Elo)", "H0": f"接受 H0 (A 不比 B 强 {args.elo1:g} Elo)",
+               None: "尚无结论"}[result["decision"]]
+    print(f"SPRT [{args.elo0:g}, {args.elo1:g}]: LLR {result['llr']:+.2f}, {verdict}")
+    print(f"用时 {result['seconds']:.1f}s, 平均每局 {result['seconds'] / max(games, 1):.2f}s")
+
+
+if __name__ == "__main__":
+    main()